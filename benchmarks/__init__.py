@@ -0,0 +1 @@
+"""Performance checks for the calculator; run each module with `python -m benchmarks.<name>`."""
@@ -0,0 +1,149 @@
+"""
+Check that the incrementally kept year-to-date totals never drift.
+
+    python -m benchmarks.consistency --steps 200 --seed 0
+
+Saves entries through the wizard (dated anywhere in two years, so most are
+backdated behind checks already stored), deletes some and imports the odd
+CSV, and after every step compares the live YTD columns, taxes, TaxYear and
+MonthlyRollup with a from-scratch recompute_ytd() + rebuild_monthly_rollup()
+of the same rows. Any difference fails the run.
+"""
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import (create_app, db, rebuild_monthly_rollup, recompute_ytd, rollup_deltas,
+                   Entry, Income, MonthlyRollup, TaxYear)
+from benchmarks.generate import scratch_config
+
+YEARS = (2023, 2024)
+TYPES = ['1099-NEC', 'W-2', 'Retirement']
+
+
+def random_check(rng):
+    # big enough that a year's checks cross the wage base and the upper brackets
+    return {
+        'sender': f'Client {rng.randrange(20)}',
+        'type':   rng.choice(TYPES),
+        'date':   f'{rng.choice(YEARS)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'gross':  f'{rng.lognormvariate(9.5, 1.2):.2f}',
+    }
+
+
+def save_entry(client, rng):
+    checks = [random_check(rng) for _ in range(rng.randint(1, 6))]
+    form = {'num_checks': str(len(checks))}
+    for i, c in enumerate(checks):
+        form.update({f'sender_{i}': c['sender'], f'Gross_{i}': c['gross'],
+                     f'type_{i}': c['type'], f'date_{i}': c['date']})
+    page = client.post('/show-taxes', data=form).get_data(as_text=True)
+    draft_id = re.search(r'name="draft_id"\s+value="(\w+)"', page).group(1)
+    final = {'draft_id': draft_id}
+    for i in range(len(checks)):
+        final[f'count_{i}'] = '1'
+        final[f'exp_name_{i}_0'] = 'gas'
+        final[f'exp_amt_{i}_0'] = f'{rng.uniform(1, 50):.2f}'
+    client.post('/show-final', data=final)
+    resp = client.post('/save-entry', data={'title': 'consistency', 'draft_id': draft_id})
+    assert resp.status_code == 302, resp.status_code
+
+
+def delete_entry(client, app, rng):
+    with app.app_context():
+        ids = [i for (i,) in db.session.query(Entry.id)]
+    if ids:
+        client.post(f'/delete-entry/{rng.choice(ids)}')
+
+
+def import_csv(client, rng):
+    lines = ['sender,gross,type,date,expenses']
+    for _ in range(rng.randint(5, 40)):
+        c = random_check(rng)
+        lines.append(f"{c['sender']},{c['gross']},{c['type']},{c['date']},fee=2.50")
+    upload = io.BytesIO('\n'.join(lines).encode())
+    resp = client.post('/api/v1/import', data={'file': (upload, 'consistency.csv')})
+    assert resp.status_code == 201, resp.get_data(as_text=True)
+
+
+def snapshot():
+    incomes = {r.id: (r.ytd_wages_cents, r.ytd_taxable_cents, r.se_cents, r.fed_cents,
+                      r.state_cents, r.net_cents, r.schedule_version)
+               for r in Income.query}
+    rollup  = {(r.year, r.month, r.income_type): (r.inc_cents, r.exp_cents, r.tax_cents, r.count)
+               for r in MonthlyRollup.query}
+    # last_date is only an upper bound (deletes never lower it), so it is not
+    # compared, and a year emptied by deletes keeps a zero row a recompute drops
+    years   = {t.year: (t.wages_cents, t.taxable_cents) for t in TaxYear.query
+               if t.wages_cents or t.taxable_cents}
+    return {'Income': incomes, 'MonthlyRollup': rollup, 'TaxYear': years}
+
+
+def drift():
+    """{table: [(key, live, recomputed), ...]} for every row that differs from a recompute."""
+    live = snapshot()
+    # clearing the running totals makes recompute_ytd() redo every row
+    Income.query.update({Income.ytd_wages_cents: None, Income.ytd_taxable_cents: None},
+                        synchronize_session=False)
+    recompute_ytd(YEARS, rollup_deltas())
+    rebuild_monthly_rollup()
+    db.session.flush()
+    fresh = snapshot()
+    db.session.rollback()
+    return {
+        table: [(k, live[table].get(k), fresh[table].get(k))
+                for k in sorted(set(live[table]) | set(fresh[table]), key=repr)
+                if live[table].get(k) != fresh[table].get(k)]
+        for table in live
+    }
+
+
+def first_drift(steps, seed=0):
+    """Run `steps` random saves, deletes and imports; (step, action, diffs) at the first drift, else None."""
+    rng    = random.Random(seed)
+    path   = os.path.join(tempfile.mkdtemp(prefix='consistency-'), 'consistency.db')
+    app    = create_app(scratch_config(path))
+    client = app.test_client()
+    for step in range(steps):
+        roll = rng.random()
+        if roll < 0.2:
+            action = 'delete'
+            delete_entry(client, app, rng)
+        elif roll < 0.25:
+            action = 'import'
+            import_csv(client, rng)
+        else:
+            action = 'save'
+            save_entry(client, rng)
+        with app.app_context():
+            diffs = drift()
+        if any(diffs.values()):
+            return step, action, diffs
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    found = first_drift(args.steps, args.seed)
+    if found:
+        step, action, diffs = found
+        for table, rows in diffs.items():
+            for key, live, fresh in rows[:5]:
+                print(f'FAIL step {step} ({action}) {table} {key}: live {live} != recomputed {fresh}',
+                      file=sys.stderr)
+        sys.exit(1)
+    print(f'ok: {args.steps} steps, no drift')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Time the hot endpoints through the Flask test client at several data sizes.
+
+    python -m benchmarks.endpoints --sizes 1000,100000,1000000 --output run.json
+
+For each size a database with that many Income rows is generated (and kept
+in --data-dir, so later runs reuse it). Every case is then timed --repeat
+times and the results are written as JSON so runs can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import create_app, db, Entry
+from benchmarks.generate import generate, scratch_config
+
+CHECKS_PER_ENTRY = 10
+SHOW_TAXES_CHECKS = 1000
+TYPES = ['1099-NEC', 'W-2', 'Retirement']
+
+
+def show_taxes_form(n):
+    form = {'num_checks': str(n)}
+    for i in range(n):
+        form.update({
+            f'sender_{i}': f'Client {i}',
+            f'Gross_{i}':  f'{1000 + i * 37.5:.2f}',
+            f'type_{i}':   TYPES[i % len(TYPES)],
+            f'date_{i}':   f'2024-{i % 12 + 1:02d}-15',
+        })
+    return form
+
+
+def show_final_form(draft_id, n):
+    form = {'draft_id': draft_id}
+    for i in range(n):
+        form[f'count_{i}'] = '2'
+        for j in range(2):
+            form[f'exp_name_{i}_{j}'] = f'expense {j}'
+            form[f'exp_amt_{i}_{j}']  = f'{10 + j}.00'
+    return form
+
+
+def cases(client, entry_id):
+    """(name, callable) pairs; each callable makes one request and returns the response."""
+    form = show_taxes_form(SHOW_TAXES_CHECKS)
+    page = client.post('/show-taxes', data=form).get_data(as_text=True)
+    draft_id = re.search(r'name="draft_id"\s+value="(\w+)"', page).group(1)
+    final_form = show_final_form(draft_id, SHOW_TAXES_CHECKS)
+    return [
+        ('show_taxes',          lambda: client.post('/show-taxes', data=form)),
+        ('show_final',          lambda: client.post('/show-final', data=final_form)),
+        ('statements',          lambda: client.get('/statements')),
+        ('download_entry',      lambda: client.get(f'/download-entry/{entry_id}')),
+        ('download_statements', lambda: client.get('/download-statements')),
+    ]
+
+
+def time_case(request, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        resp = request()
+        resp.get_data()   # drain streamed bodies inside the timing
+        samples.append(time.perf_counter() - started)
+        if resp.status_code != 200:
+            raise RuntimeError(f'HTTP {resp.status_code}')
+    return {
+        'min':    round(min(samples), 4),
+        'median': round(statistics.median(samples), 4),
+        'max':    round(max(samples), 4),
+        'bytes':  len(resp.get_data()),
+    }
+
+
+def run_size(rows, data_dir, repeat):
+    path = os.path.join(data_dir, f'bench_{rows}.db')
+    if not os.path.exists(path):
+        print(f'generating {path} ...', file=sys.stderr)
+        generate(path, entries=max(rows // CHECKS_PER_ENTRY, 1), checks=CHECKS_PER_ENTRY)
+
+    app = create_app(scratch_config(path))
+    client = app.test_client()
+    with app.app_context():
+        entry_id = db.session.query(db.func.min(Entry.id)).scalar()
+
+    results = {}
+    for name, request in cases(client, entry_id):
+        print(f'{rows:>9} rows  {name} ...', file=sys.stderr)
+        results[name] = time_case(request, repeat)
+    with app.app_context():
+        db.engine.dispose()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help='comma separated Income row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'la-tax-bench'))
+    parser.add_argument('--output', help='write the JSON result here as well as to stdout')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    result = {
+        'started':  datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'repeat':   args.repeat,
+        'sizes':    {},
+    }
+    for rows in (int(s) for s in args.sizes.split(',')):
+        result['sizes'][str(rows)] = run_size(rows, args.data_dir, args.repeat)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
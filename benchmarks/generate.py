@@ -0,0 +1,132 @@
+"""
+Fill a SQLite file with synthetic entries for the benchmarks.
+
+    python -m benchmarks.generate bench.db --entries 10000 --checks 10
+
+Every entry gets `--checks` checks from distinct senders with a realistic
+income_type mix, dates spread over several years and up to
+`--max-expenses` expenses per check. Taxes come from the real engine and
+MonthlyRollup is rebuilt at the end, so the file looks like one the app
+wrote itself (the wage base is settled per year once all rows are in).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import (create_app, db, draft_csvs, rebuild_monthly_rollup, recompute_ytd,
+                   rollup_deltas, Entry, Income, Expense)
+from tax_engine import compute_taxes, to_cents
+
+INCOME_TYPES = {'1099-NEC': 0.6, 'W-2': 0.3, 'Retirement': 0.1}
+EXPENSE_NAMES = ['gas', 'mileage', 'phone', 'software', 'supplies', 'meals', 'insurance', 'rent']
+YEARS = (2021, 2022, 2023, 2024)
+BATCH_ENTRIES = 1000
+
+
+def random_entry(rng, checks):
+    first = date(YEARS[0], 1, 1)
+    span  = (date(YEARS[-1], 12, 31) - first).days
+    start = first + timedelta(days=rng.randrange(span))
+    types = rng.choices(list(INCOME_TYPES), weights=list(INCOME_TYPES.values()), k=checks)
+    return [
+        {
+            'sender': f'Client {n}',
+            'type':   t,
+            'date':   min(start + timedelta(days=rng.randrange(31)), date(YEARS[-1], 12, 31)),
+            'gross':  to_cents(round(rng.lognormvariate(7.5, 1.0), 2)),
+        }
+        for n, t in zip(rng.sample(range(checks * 5), checks), types)
+    ]
+
+
+def scratch_config(path):
+    """App config for a scratch database at `path`; its workbooks go beside it, not into the checkout."""
+    workdir = os.path.dirname(os.path.abspath(path))
+    return {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(path)}',
+        'EXPORT_DIR':  os.path.join(workdir, 'exports'),
+        'REPORTS_DIR': os.path.join(workdir, 'reports'),
+    }
+
+
+def generate(path, entries, checks=10, max_expenses=3, seed=0):
+    """Write `entries` synthetic entries into the SQLite file at `path`."""
+    rng = random.Random(seed)
+    app = create_app(scratch_config(path))
+    with app.app_context():
+        next_id = (db.session.query(db.func.max(Entry.id)).scalar() or 0) + 1
+        for batch_start in range(0, entries, BATCH_ENTRIES):
+            entry_rows, income_rows, expense_rows = [], [], []
+            for entry_id in range(next_id + batch_start,
+                                  next_id + min(batch_start + BATCH_ENTRIES, entries)):
+                raw   = random_entry(rng, checks)
+                taxes = {k: v.tolist() for k, v in compute_taxes(
+                    [c['gross'] for c in raw], [c['type'] for c in raw],
+                    years=[c['date'].year for c in raw]).items()}
+                draft = SimpleNamespace(checks=[], expenses=[])
+                for k, c in enumerate(raw):
+                    row = dict(
+                        entry_id=entry_id, sender=c['sender'], gross_cents=c['gross'],
+                        income_type=c['type'], date=c['date'],
+                        se_cents=taxes['se'][k],
+                        fed_cents=taxes['fed'][k],
+                        state_cents=taxes['state'][k],
+                        net_cents=taxes['net'][k],
+                        schedule_version=taxes['version'][k],
+                    )
+                    income_rows.append(row)
+                    draft.checks.append({
+                        'sender': c['sender'], 'type': c['type'], 'date': c['date'].isoformat(),
+                        'gross': c['gross'], 'se': row['se_cents'], 'fed': row['fed_cents'],
+                        'state': row['state_cents'], 'total': taxes['total'][k],
+                        'net': row['net_cents'],
+                    })
+                    for _ in range(rng.randint(0, max_expenses)):
+                        amount = rng.randint(500, max(c['gross'] // 5, 500))
+                        draft.expenses.append({'sender': c['sender'],
+                                               'name': rng.choice(EXPENSE_NAMES),
+                                               'amount': amount})
+                        expense_rows.append(dict(entry_id=entry_id, sender=c['sender'],
+                                                 name=draft.expenses[-1]['name'],
+                                                 amount_cents=amount, date=c['date']))
+                tax_csv, exp_csv, final_csv = draft_csvs(draft)
+                entry_rows.append(dict(
+                    id=entry_id, title=f'Synthetic {entry_id}',
+                    timestamp=datetime.combine(raw[0]['date'], datetime.min.time()),
+                    tax_csv=tax_csv, exp_csv=exp_csv, final_csv=final_csv,
+                ))
+            # Core executemany; going through the ORM unit of work would
+            # dominate the run time at a million rows
+            db.session.execute(db.insert(Entry), entry_rows)
+            db.session.execute(db.insert(Income), income_rows)
+            if expense_rows:
+                db.session.execute(db.insert(Expense), expense_rows)
+            db.session.commit()
+        recompute_ytd(YEARS, rollup_deltas())
+        rebuild_monthly_rollup()
+        db.session.commit()
+        return db.session.query(db.func.count(Income.id)).scalar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--checks', type=int, default=10, help='checks per entry')
+    parser.add_argument('--max-expenses', type=int, default=3, help='expenses per check, at most')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = generate(args.path, args.entries, args.checks, args.max_expenses, args.seed)
+    print(f'{args.path}: {rows} income rows in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Check that the report paths run a fixed number of SQL statements.
+
+    python -m benchmarks.queries --sizes 20,400
+
+Each path is run against generated databases of different sizes and its
+statement count compared; a count that grows with the number of entries is
+an N+1 (a relationship lazy-loaded inside a loop) and fails the run.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from index import create_app, db, _backfill_expenses, Entry
+from benchmarks.generate import generate, scratch_config
+
+
+@contextmanager
+def count_queries(engine):
+    counter = {'n': 0}
+    def count(*args):
+        counter['n'] += 1
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+
+def backfill_expenses():
+    _backfill_expenses()
+    db.session.rollback()
+
+
+def paths(entry_id):
+    """(name, kind, target): kind 'get' requests a URL, 'call' runs a function in an app context."""
+    return [
+        ('statements',           'get',  '/statements'),
+        ('statements, filtered', 'get',  '/statements?type=W-2'),
+        ('statement_month',      'get',  '/statements/2023-06'),
+        ('saved_entries',        'get',  '/saved-entries'),
+        ('view_entry',           'get',  f'/view-entry/{entry_id}'),
+        ('download_entry',       'get',  f'/download-entry/{entry_id}'),
+        ('download_statements',  'get',  '/download-statements'),
+        ('backfill_expenses',    'call', backfill_expenses),
+    ]
+
+
+def measure(path):
+    app = create_app(scratch_config(path))
+    client = app.test_client()
+    counts = {}
+    with app.app_context():
+        engine   = db.engine
+        entry_id = db.session.query(db.func.min(Entry.id)).scalar()
+        db.session.remove()
+    for name, kind, target in paths(entry_id):
+        with count_queries(engine) as counter:
+            if kind == 'get':
+                client.get(target).get_data()
+            else:
+                with app.app_context():
+                    target()
+        counts[name] = counter['n']
+    return counts
+
+
+def growing(results):
+    """Names of the paths whose count differs between the sizes in `results`."""
+    return [name for name in next(iter(results.values()))
+            if len({counts[name] for counts in results.values()}) > 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='20,400', help='comma separated entry counts')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='queries-')
+    results = {}
+    for entries in (int(n) for n in args.sizes.split(',')):
+        path = os.path.join(workdir, f'queries_{entries}.db')
+        generate(path, entries=entries)
+        results[entries] = measure(path)
+
+    print(json.dumps(results, indent=2))
+    failed = growing(results)
+    for name in failed:
+        print(f'FAIL {name}: query count grows with the number of entries', file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
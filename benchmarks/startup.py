@@ -0,0 +1,109 @@
+"""
+Time to first response from a cold start.
+
+    python -m benchmarks.startup                      # python index.py
+    python -m benchmarks.startup --exe dist/index.exe # the PyInstaller build
+
+Each run copies the build into a fresh directory (so it starts with its own
+entries.db, or a copy of --db), launches it on a free port and times how long
+it takes for GET / to answer. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ('index.py', 'tax_engine.py')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def stop(proc):
+    # debug mode runs a reloader child, so take down the whole process group
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)], capture_output=True)
+    else:
+        os.killpg(proc.pid, signal.SIGTERM)
+    proc.wait()
+
+
+def time_to_first_response(exe=None, db=None, timeout=60.0):
+    workdir = tempfile.mkdtemp(prefix='startup-')
+    try:
+        if exe:
+            cmd = [os.path.join(workdir, os.path.basename(exe))]
+            shutil.copy2(exe, cmd[0])
+        else:
+            for name in SOURCES:
+                shutil.copy2(os.path.join(REPO, name), workdir)
+            cmd = [sys.executable, 'index.py']
+        if db:
+            shutil.copy2(db, os.path.join(workdir, 'entries.db'))
+
+        port = free_port()
+        env  = dict(os.environ, PORT=str(port))
+        kw   = ({'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt'
+                else {'start_new_session': True})
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kw)
+        try:
+            while time.perf_counter() - started < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f'{cmd[0]} exited with {proc.returncode} before serving')
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1) as resp:
+                        if resp.status == 200:
+                            return time.perf_counter() - started
+                except (urllib.error.URLError, ConnectionError, socket.timeout):
+                    time.sleep(0.02)
+            raise RuntimeError(f'no response within {timeout}s')
+        finally:
+            stop(proc)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--exe', help='frozen build to time instead of python index.py')
+    parser.add_argument('--db', help='entries.db to start from instead of an empty one')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='also write the JSON result here')
+    args = parser.parse_args(argv)
+
+    samples = [time_to_first_response(args.exe, args.db) for _ in range(args.runs)]
+    result = {
+        'build':   'frozen' if args.exe else 'source',
+        'target':  args.exe or os.path.join(REPO, 'index.py'),
+        'runs':    args.runs,
+        'seconds': {
+            'min':    round(min(samples), 4),
+            'median': round(statistics.median(samples), 4),
+            'max':    round(max(samples), 4),
+        },
+        'samples': [round(t, 4) for t in samples],
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,89 @@
-import sys, os
-from datetime import datetime,date
-from flask import Flask, render_template_string, request, send_file, redirect, url_for, flash, session
+import sys, os, time, tempfile, json, uuid, csv, threading, hashlib
+from datetime import datetime,date,timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, lru_cache
+from itertools import islice, accumulate, product
+from bisect import bisect_right
+from flask import Flask, Blueprint, current_app, render_template, request, send_file, redirect, url_for, flash, abort, g
+from flask import has_request_context, Response
+from flask import before_render_template, template_rendered
+import click
+from jinja2 import DictLoader, FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
-import pandas as pd
-from io import BytesIO, StringIO
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.chart import PieChart, Reference
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.hybrid import hybrid_property
+from io import StringIO
 from collections import defaultdict
+# pandas and openpyxl are imported inside the export code paths: they are
+# the bulk of a cold start and most requests never touch them
+from tax_engine import (
+    compute_taxes, running_ytd, scenario_grid, schedule_for, to_cents, dollars, TaxSchedule,
+    FEDERAL_RATES, MAX_CENTS, RATE_SCALE, SS_WAGE_TYPES, TAXED_TYPES
+)
 if getattr(sys, 'frozen', False):
     basedir = os.path.dirname(sys.executable)
 else:
     basedir = os.path.abspath(os.path.dirname(__file__))
 
-db_path   = os.path.join(basedir, 'entries.db')
-saved_dir = os.path.join(basedir, 'saved_entries')
-os.makedirs(saved_dir, exist_ok=True)
+db_path    = os.path.join(basedir, 'entries.db')
+saved_dir  = os.path.join(basedir, 'saved_entries')
+
+DEFAULT_CONFIG = {}
+DEFAULT_CONFIG['SECRET_KEY'] = 'replace_with_real_secret'
+DEFAULT_CONFIG['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+DEFAULT_CONFIG['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# applied to every new SQLite connection; WAL lets exports read while saves write
+DEFAULT_CONFIG['SQLITE_PRAGMAS'] = {
+    'journal_mode':       'WAL',
+    'synchronous':        'NORMAL',
+    'foreign_keys':       'ON',
+    'busy_timeout':       5000,           # ms to wait on a lock before "database is locked"
+    'cache_size':         -16000,         # negative = KiB, so ~16 MB of page cache
+    'mmap_size':          256 * 2**20,
+    'wal_autocheckpoint': 1000,           # pages
+    'journal_size_limit': 64 * 2**20,     # truncate the WAL back to this after checkpoints
+}
+# a full checkpoint at most this often, run after a response has gone out
+DEFAULT_CONFIG['SQLITE_CHECKPOINT_INTERVAL'] = 300   # seconds, 0 to disable
+DEFAULT_CONFIG['SQLITE_CHECKPOINT_MODE']     = 'TRUNCATE'
+DEFAULT_CONFIG['DRAFT_TTL'] = 7 * 24 * 3600   # seconds an untouched draft is kept
+DEFAULT_CONFIG['EXPORT_WORKERS'] = 2
+DEFAULT_CONFIG['EXPORT_JOB_TTL'] = 24 * 3600   # seconds a finished export is kept
+# generated workbooks: background exports, and the report cache keyed by content
+DEFAULT_CONFIG['EXPORT_DIR']  = os.path.join(saved_dir, 'exports')
+DEFAULT_CONFIG['REPORTS_DIR'] = os.path.join(saved_dir, 'reports')
+DEFAULT_CONFIG['REPORT_CACHE_BYTES'] = 256 * 2**20   # cached .xlsx files kept in REPORTS_DIR
+DEFAULT_CONFIG['ENTRIES_PER_PAGE'] = 50
+DEFAULT_CONFIG['API_MAX_CHECKS'] = 100_000   # per /api/v1/calculate request
+DEFAULT_CONFIG['IMPORT_ENTRY_CHECKS'] = 1000  # an import is filed as entries of at most this many
+DEFAULT_CONFIG['SCENARIOS_MAX'] = 100_000    # grid size per /scenarios request
+DEFAULT_CONFIG['SCENARIOS_TABLE_ROWS'] = 500   # rows the page shows; the API returns all
+DEFAULT_CONFIG['STATEMENTS_CACHE_SIZE'] = 32   # (filter_type, data_version) results kept
+# requests slower than this are logged with their query count; None to disable
+DEFAULT_CONFIG['SLOW_REQUEST_SECONDS'] = 1.0
+# Compiled templates are also written here as Jinja bytecode, so a cold start
+# skips compiling them again. The frozen exe ships the cache made by
+# `flask compile-templates` at build time; None keeps them in memory only.
+if getattr(sys, 'frozen', False):
+    DEFAULT_CONFIG['TEMPLATE_BYTECODE_CACHE'] = os.path.join(getattr(sys, '_MEIPASS', basedir), 'template_cache')
+else:
+    DEFAULT_CONFIG['TEMPLATE_BYTECODE_CACHE'] = None
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'replace_with_real_secret'
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db = SQLAlchemy()
+bp = Blueprint('main', __name__, cli_group=None)
 
-db = SQLAlchemy(app)
+def money(name, **kwargs):
+    """
+    An amount of money: integer cents under its historical column name, so
+    sums are exact. convert_money_columns() upgrades the old REAL dollars.
+    """
+    return db.Column(name, db.Integer, info={'cents': True}, **kwargs)
 
 class Entry(db.Model):
+    __table_args__ = (
+        db.Index('ix_entry_timestamp_id', 'timestamp', 'id'),   # saved_entries keyset order
+    )
     id         = db.Column(db.Integer, primary_key=True)
     title      = db.Column(db.String(255), nullable=False)   # <-- new!
     timestamp  = db.Column(db.DateTime, default=datetime.utcnow)
@@ -37,9 +96,19 @@ class Entry(db.Model):
         backref='entry',
         cascade='all, delete-orphan'
     )
+    expenses   = db.relationship(
+        'Expense',
+        backref='entry',
+        cascade='all, delete-orphan'
+    )
 
 class Income(db.Model):
     __tablename__ = 'income'
+    __table_args__ = (
+        db.Index('ix_income_type_date', 'income_type', 'date'),
+        db.Index('ix_income_entry_id',  'entry_id'),
+        db.Index('ix_income_date',      'date'),
+    )
     id          = db.Column(db.Integer, primary_key=True)
     entry_id    = db.Column(
         db.Integer,
@@ -47,34 +116,554 @@ class Income(db.Model):
         nullable=False
     )
     sender      = db.Column(db.String(80),  nullable=False)
-    Gross       = db.Column(db.Float,      nullable=False)
+    gross_cents = money('Gross',           nullable=False)
     income_type = db.Column(db.String(20), nullable=False)
     date        = db.Column(db.Date,       default=datetime.utcnow().date)
 
+    # tax components written once by apply_taxes(); read paths never redo the math
+    se_cents         = money('se_tax')
+    fed_cents        = money('fed_tax')
+    state_cents      = money('state_tax')
+    net_cents        = money('net')
+    schedule_version = db.Column(db.String(20))
+    # SS wages and taxable income earned earlier in the same year, checks
+    # taken in (date, id) order; kept current by insert_ytd()/remove_ytd()/
+    # recompute_ytd()
+    ytd_wages_cents   = money('ytd_before')
+    ytd_taxable_cents = money('taxable_before')
+
+    @hybrid_property
+    def tax_cents(self):
+        return self.se_cents + self.fed_cents + self.state_cents
+
+class Expense(db.Model):
+    __tablename__ = 'expense'
+    id          = db.Column(db.Integer, primary_key=True)
+    entry_id    = db.Column(
+        db.Integer,
+        db.ForeignKey('entry.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    sender      = db.Column(db.String(80),  nullable=False, index=True)
+    name        = db.Column(db.String(255), nullable=False)
+    amount_cents = money('amount',          nullable=False)
+    date        = db.Column(db.Date,        nullable=False, index=True)
+
+class MonthlyRollup(db.Model):
+    """
+    Running per-month totals, kept in step with Income/Expense by
+    save_entry and delete_entry so the dashboards never rescan history.
+    Expenses are filed under the income type of the check they belong to;
+    `count` is the number of Income and Expense rows folded into a bucket.
+    """
+    __tablename__ = 'monthly_rollup'
+    year        = db.Column(db.Integer,    primary_key=True)
+    month       = db.Column(db.Integer,    primary_key=True)
+    income_type = db.Column(db.String(20), primary_key=True)
+    inc_cents   = money('inc_total',       nullable=False, default=0)
+    exp_cents   = money('exp_total',       nullable=False, default=0)
+    tax_cents   = money('tax_total',       nullable=False, default=0)
+    count       = db.Column(db.Integer,    nullable=False, default=0)
+
+class TaxYear(db.Model):
+    """
+    The per-year accumulator: SS wages and taxable income of every stored
+    check of the year. A check dated on or after `last_date` starts from
+    these totals, so adding it needs no scan of the year. `last_date` is not
+    lowered on delete; it only has to be an upper bound.
+    """
+    __tablename__ = 'tax_year'
+    year          = db.Column(db.Integer, primary_key=True)
+    wages_cents   = money('wages',        nullable=False, default=0)
+    taxable_cents = money('taxable',      nullable=False, default=0)
+    last_date     = db.Column(db.Date,    nullable=False)
+
+class DataVersion(db.Model):
+    """
+    A single counter, bumped in the same transaction as every write that
+    changes report data. Cached results are keyed on it, so a new version
+    makes them unreachable without any explicit invalidation.
+    """
+    __tablename__ = 'data_version'
+    id          = db.Column(db.Integer, primary_key=True)
+    version     = db.Column(db.Integer, nullable=False, default=0)
+
+class ExportJob(db.Model):
+    """A report build handed to the background worker pool; see enqueue_export()."""
+    __tablename__ = 'export_job'
+    id          = db.Column(db.String(32),  primary_key=True)
+    kind        = db.Column(db.String(20),  nullable=False)   # key into EXPORT_BUILDERS
+    params      = db.Column(db.Text,        nullable=False)   # JSON kwargs for the builder
+    status      = db.Column(db.String(10),  nullable=False, default='queued', index=True)
+    progress    = db.Column(db.Float,       nullable=False, default=0.0)
+    path        = db.Column(db.String(255))
+    error       = db.Column(db.Text)
+    created_at  = db.Column(db.DateTime,    default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class Draft(db.Model):
+    """
+    The wizard's work in progress. Each step loads it by id instead of
+    round-tripping the whole tax table through hidden form fields.
+    """
+    __tablename__ = 'draft'
+    id          = db.Column(db.String(32), primary_key=True)
+    checks      = db.Column(db.JSON,       nullable=False)   # one dict per check, keyed by CHECK_KEYS, money in cents
+    expenses    = db.Column(db.JSON,       nullable=False, default=list)   # {sender, name, amount (cents)}
+    updated_at  = db.Column(db.DateTime,   default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+
+def expenses_from_csv(exp_csv, date_map, default_date):
+    """
+    Turn an exp_csv blob (Sender,Name,Amount,Net Profit) into Expense rows.
+    Each expense is dated by its sender's check, falling back to `default_date`.
+    """
+    if not exp_csv or not exp_csv.strip():
+        return []
+    import pandas as pd
+    try:
+        df_exp = pd.read_csv(StringIO(exp_csv), dtype={'Amount': str})
+    except pd.errors.EmptyDataError:
+        return []
+    return [
+        Expense(
+            sender       = str(sender),
+            name         = str(name),
+            amount_cents = to_cents(amt),
+            date         = date_map.get(sender, default_date)
+        )
+        for sender, name, amt in df_exp[['Sender', 'Name', 'Amount']].values.tolist()
+    ]
+
+
+def apply_taxes(incomes):
+    """Compute every check's tax components in one engine call and store them."""
+    taxes = compute_taxes([inc.gross_cents for inc in incomes],
+                          [inc.income_type for inc in incomes],
+                          [inc.ytd_wages_cents or 0 for inc in incomes],
+                          [inc.ytd_taxable_cents or 0 for inc in incomes],
+                          [inc.date.year for inc in incomes])
+    se, fed, st, net = (taxes[k].tolist() for k in ('se', 'fed', 'state', 'net'))
+    for k, inc in enumerate(incomes):
+        inc.se_cents         = se[k]
+        inc.fed_cents        = fed[k]
+        inc.state_cents      = st[k]
+        inc.net_cents        = net[k]
+        inc.schedule_version = taxes['version'][k]
+
+def in_year(year):
+    return db.and_(Income.date >= date(year, 1, 1), Income.date < date(year + 1, 1, 1))
+
+def new_checks_ytd(dates, types, grosses):
+    """
+    Year-to-date (SS wages, taxable income) before each of a batch of checks
+    about to be stored: the batch's own earlier checks plus everything Income
+    already holds for that year up to and including the same date (stored
+    checks come first on a tie, having the lower ids).
+    """
+    wages, taxable = running_ytd([(d.year, d) for d in dates], types, grosses)
+    years  = {d.year for d in dates}
+    states = {t.year: t for t in TaxYear.query.filter(TaxYear.year.in_(years))}
+    for year, state in states.items():
+        batch = [k for k, d in enumerate(dates) if d.year == year]
+        if all(dates[k] >= state.last_date for k in batch):
+            # checks added at the end of the year, the usual case: the
+            # accumulator already holds everything before them
+            opening = {k: (state.wages_cents, state.taxable_cents) for k in batch}
+        else:
+            stored = db.session.query(
+                    Income.date,
+                    db.func.sum(db.case((Income.income_type.in_(SS_WAGE_TYPES), Income.gross_cents), else_=0)),
+                    db.func.sum(db.case((Income.income_type.in_(TAXED_TYPES),   Income.gross_cents), else_=0)),
+                ).filter(in_year(year)).group_by(Income.date).order_by(Income.date).all()
+            days = [d for d, _, _ in stored]
+            cum  = list(zip(accumulate(w for _, w, _ in stored), accumulate(t for _, _, t in stored)))
+            opening = {}
+            for k in batch:
+                i = bisect_right(days, dates[k])
+                opening[k] = cum[i - 1] if i else (0, 0)
+        for k, (w, t) in opening.items():
+            wages[k]   += w
+            taxable[k] += t
+    return wages, taxable
+
+def add_to_tax_years(incomes, sign=1):
+    """Fold checks into their TaxYear accumulators (sign=1) or take them out (sign=-1)."""
+    totals = {}
+    for inc in incomes:
+        t = totals.setdefault(inc.date.year, {'wages_cents': 0, 'taxable_cents': 0, 'last_date': inc.date})
+        t['wages_cents']   += sign * inc.gross_cents * (inc.income_type in SS_WAGE_TYPES)
+        t['taxable_cents'] += sign * inc.gross_cents * (inc.income_type in TAXED_TYPES)
+        t['last_date']      = max(t['last_date'], inc.date)
+    if not totals:
+        return
+    stmt = sqlite_insert(TaxYear).values([dict(year=y, **t) for y, t in totals.items()])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['year'],
+        set_={
+            'wages':     TaxYear.wages_cents   + stmt.excluded.wages,
+            'taxable':   TaxYear.taxable_cents + stmt.excluded.taxable,
+            'last_date': db.func.max(TaxYear.last_date, stmt.excluded.last_date),
+        }
+    ))
+
+def shift_ytd(year, later, wages, taxable, deltas):
+    """
+    Move the running totals of the stored checks of `year` matched by `later` by
+    `wages` and `taxable` and re-tax the taxed ones that can owe a different
+    amount: any of them when taxable income moves (their federal brackets
+    shift), otherwise only those under the SS wage base on one side of the move.
+    The totals move in one UPDATE; the checks to re-tax are then read back
+    and written YTD_BATCH_ROWS at a time, as in recompute_ytd(), so a
+    backdated save into a busy year never loads its later checks whole.
+    """
+    Income.query.filter(later).update({
+        Income.ytd_wages_cents:   Income.ytd_wages_cents   + wages,
+        Income.ytd_taxable_cents: Income.ytd_taxable_cents + taxable,
+    }, synchronize_session=False)
+    moved = db.select(
+        Income.id, Income.income_type, Income.gross_cents,
+        db.cast(db.func.strftime('%m', Income.date), db.Integer), Income.tax_cents,
+        Income.ytd_wages_cents, Income.ytd_taxable_cents,
+    ).where(later, Income.income_type.in_(TAXED_TYPES))
+    if not taxable:
+        # under the base before the move or after it, the totals having moved already
+        wage_base = schedule_for(year).ss_wage_base
+        moved = moved.where(Income.ytd_wages_cents < wage_base + max(wages, 0))
+    for batch in db.session.execute(moved.execution_options(yield_per=YTD_BATCH_ROWS)).partitions():
+        retax_stale(batch, year, deltas)
+
+def ytd_shift(inc, sign):
+    return (sign * inc.gross_cents * (inc.income_type in SS_WAGE_TYPES),
+            sign * inc.gross_cents * (inc.income_type in TAXED_TYPES))
+
+def insert_ytd(incomes):
+    """
+    Set the running totals on new checks, move the later checks of their
+    years up by each one and add them to the TaxYear accumulators; returns
+    the rollup changes for those later checks. Call before the new rows are
+    added to the session.
+    """
+    wages, taxable = new_checks_ytd([inc.date for inc in incomes],
+                                    [inc.income_type for inc in incomes],
+                                    [inc.gross_cents for inc in incomes])
+    deltas = rollup_deltas()
+    for inc, w, t in zip(incomes, wages, taxable):
+        inc.ytd_wages_cents, inc.ytd_taxable_cents = w, t
+        shift = ytd_shift(inc, 1)
+        if any(shift):
+            year = inc.date.year
+            shift_ytd(year, db.and_(in_year(year), Income.date > inc.date), *shift, deltas)
+    add_to_tax_years(incomes)
+    return deltas
+
+def remove_ytd(incomes):
+    """The reverse of insert_ytd() for stored checks about to be deleted."""
+    gone   = [inc.id for inc in incomes]
+    deltas = rollup_deltas()
+    for inc in incomes:
+        shift = ytd_shift(inc, -1)
+        if any(shift):
+            year  = inc.date.year
+            later = db.and_(in_year(year), Income.id.notin_(gone),
+                            db.tuple_(Income.date, Income.id) > (inc.date, inc.id))
+            shift_ytd(year, later, *shift, deltas)
+    add_to_tax_years(incomes, sign=-1)
+    return deltas
+
+YTD_BATCH_ROWS = 5000   # rows per read and write in recompute_ytd() and shift_ytd()
+# plain executemany: the ORM's bulk update by primary key costs more than SQLite does
+RETAX_SQL = ('UPDATE income SET ytd_before = ?, taxable_before = ?, se_tax = ?, fed_tax = ?, '
+             'state_tax = ?, net = ?, schedule_version = ? WHERE id = ?')
+MOVE_YTD_SQL = 'UPDATE income SET ytd_before = ?, taxable_before = ? WHERE id = ?'
+# and straight from the driver on the way in, dates left as their ISO text
+YEAR_ROWS_SQL = ('SELECT id, income_type, Gross, se_tax + fed_tax + state_tax, ytd_before, '
+                 'taxable_before, schedule_version, date FROM income '
+                 'WHERE date >= ? AND date < ? ORDER BY date, id')
+
+def recompute_ytd(years, deltas):
+    """
+    Recompute each year's running totals in (date, id) order and rewrite the
+    totals and taxes of every row where they are off or taxed under an
+    outdated version of the year's schedule, resetting the year's TaxYear;
+    rollup changes are added to `deltas`. For bulk writes, where shifting
+    check by check would cost more than one pass over the year.
+    The year is read in index order YTD_BATCH_ROWS at a time with the
+    totals carried across batches, and its stale rows are written back a
+    batch at a time, so memory stays flat however many checks it has.
+    Checks of untaxed types owe nothing wherever they fall in the year, so
+    when only their totals are off just those are written, without a trip
+    through the engine.
+    """
+    for year in years:
+        TaxYear.query.filter_by(year=year).delete()
+        version = schedule_for(year).version
+        conn    = db.session.connection()
+        rows    = conn.exec_driver_sql(YEAR_ROWS_SQL, (f'{year:04d}-01-01', f'{year + 1:04d}-01-01'))
+
+        wages = taxable = 0
+        last  = None
+        for batch in iter(partial(rows.fetchmany, YTD_BATCH_ROWS), []):
+            retax, moved = [], []
+            for row_id, inc_type, gross, tax, old_wages, old_taxable, old_version, day in batch:
+                if old_version != version or (inc_type in TAXED_TYPES and
+                                              (old_wages, old_taxable) != (wages, taxable)):
+                    retax.append((row_id, inc_type, gross, int(day[5:7]), tax, wages, taxable))
+                elif (old_wages, old_taxable) != (wages, taxable):
+                    moved.append((wages, taxable, row_id))
+                if inc_type in SS_WAGE_TYPES:
+                    wages += gross
+                if inc_type in TAXED_TYPES:
+                    taxable += gross
+            last = batch[-1][-1]
+            retax_stale(retax, year, deltas)
+            if moved:
+                conn.exec_driver_sql(MOVE_YTD_SQL, moved)
+        if last:
+            db.session.add(TaxYear(year=year, wages_cents=wages, taxable_cents=taxable,
+                                   last_date=date.fromisoformat(last)))
+
+def retax_stale(rows, year, deltas):
+    """
+    Write checks of `year` back with new running totals and taxes, each row
+    (id, income_type, gross_cents, month, old tax_cents, ytd wages, ytd taxable).
+    """
+    if not rows:
+        return
+    ids, types, gross, months, old_tax, wages, taxable = zip(*rows)
+    taxes = compute_taxes(gross, types, wages, taxable, [year] * len(rows))
+    se, fed, st, net, total, version = (
+        taxes[k].tolist() for k in ('se', 'fed', 'state', 'net', 'total', 'version'))
+    for k in range(len(rows)):
+        deltas[(year, months[k], types[k])]['tax_cents'] += total[k] - (old_tax[k] or 0)
+    db.session.connection().exec_driver_sql(
+        RETAX_SQL, list(zip(wages, taxable, se, fed, st, net, version, ids)))
+
+def rollup_entry(incomes, expenses, sign=1):
+    """
+    Fold one entry's incomes and expenses into MonthlyRollup (sign=1) or
+    take them back out (sign=-1), inside the caller's transaction.
+    """
+    # an expense counts under the type of its sender's first check in the
+    # entry (incomes come in id order), as in rebuild_monthly_rollup()
+    type_map = {}
+    for inc in incomes:
+        type_map.setdefault(inc.sender, inc.income_type)
+
+    deltas = rollup_deltas()
+    for inc in incomes:
+        d = deltas[(inc.date.year, inc.date.month, inc.income_type)]
+        d['inc_cents'] += sign * inc.gross_cents
+        d['tax_cents'] += sign * inc.tax_cents
+        d['count']     += sign
+    for ex in expenses:
+        d = deltas[(ex.date.year, ex.date.month, type_map.get(ex.sender, ''))]
+        d['exp_cents'] += sign * ex.amount_cents
+        d['count']     += sign
+    apply_rollup_deltas(deltas)
+
+def rollup_deltas():
+    """{(year, month, income_type): {attribute: change}}, filled in by the caller."""
+    return defaultdict(lambda: {'inc_cents': 0, 'exp_cents': 0, 'tax_cents': 0, 'count': 0})
+
+def apply_rollup_deltas(deltas):
+    if not deltas:
+        return
+    stmt = sqlite_insert(MonthlyRollup).values([
+        dict(year=y, month=m, income_type=t, **d) for (y, m, t), d in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['year', 'month', 'income_type'],
+        set_={col.name: col + stmt.excluded[col.name]
+              for col in map(db.inspect(MonthlyRollup).columns.get,
+                             ('inc_cents', 'exp_cents', 'tax_cents', 'count'))}
+    )
+    db.session.execute(stmt)
+    MonthlyRollup.query.filter(MonthlyRollup.count <= 0).delete()
+
+def bump_data_version():
+    stmt = sqlite_insert(DataVersion).values(id=1, version=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['id'], set_={'version': DataVersion.version + 1}
+    ))
+
+def current_data_version():
+    return db.session.query(DataVersion.version).filter_by(id=1).scalar() or 0
+
+def rebuild_monthly_rollup():
+    """Recompute MonthlyRollup from scratch out of the Income and Expense tables."""
+    MonthlyRollup.query.delete()
+    year  = db.cast(db.func.strftime('%Y', Income.date), db.Integer)
+    month = db.cast(db.func.strftime('%m', Income.date), db.Integer)
+    buckets = rollup_deltas()
+    for y, m, t, inc, tax, n in db.session.query(
+            year, month, Income.income_type,
+            db.func.sum(Income.gross_cents),
+            db.func.coalesce(db.func.sum(Income.tax_cents), 0),
+            db.func.count()
+        ).group_by(year, month, Income.income_type):
+        buckets[(y, m, t)].update(inc_cents=inc, tax_cents=tax, count=n)
+
+    check_type = db.session.query(Income.income_type)\
+                           .filter(Income.entry_id == Expense.entry_id,
+                                   Income.sender == Expense.sender)\
+                           .order_by(Income.id).limit(1).scalar_subquery()
+    exp_type  = db.func.coalesce(check_type, '')
+    exp_year  = db.cast(db.func.strftime('%Y', Expense.date), db.Integer)
+    exp_month = db.cast(db.func.strftime('%m', Expense.date), db.Integer)
+    for y, m, t, amt, n in db.session.query(
+            exp_year, exp_month, exp_type,
+            db.func.sum(Expense.amount_cents),
+            db.func.count()
+        ).group_by(exp_year, exp_month, exp_type):
+        b = buckets[(y, m, t)]
+        b['exp_cents'] += amt
+        b['count']     += n
+
+    db.session.add_all(MonthlyRollup(year=y, month=m, income_type=t, **b)
+                       for (y, m, t), b in buckets.items())
+
+
+def convert_money_columns():
+    """
+    Rebuild any table whose money() columns are still REAL dollars with
+    INTEGER cents, rounding half away from zero. SQLite cannot change a
+    column's type in place, so the table is renamed, recreated from the
+    model and copied across. Runs before the migrations, which all work in cents.
+    """
+    inspector = db.inspect(db.engine)
+    quote     = db.engine.dialect.identifier_preparer.quote
+    converted = False
+    for table in db.metadata.sorted_tables:
+        cents = {c.name.lower() for c in table.columns if c.info.get('cents')}
+        if not cents or not inspector.has_table(table.name):
+            continue
+        # SQLite column names are case-insensitive, and old files say "gross"
+        have = {c['name'].lower(): c['type'] for c in inspector.get_columns(table.name)}
+        if all(isinstance(have.get(name), db.Integer) for name in cents if name in have):
+            continue
+        old = f'{table.name}_dollars'
+        indexes = inspector.get_indexes(table.name)   # they follow the rename; free their names
+        db.session.execute(db.text(f'ALTER TABLE {table.name} RENAME TO {old}'))
+        for index in indexes:
+            db.session.execute(db.text(f'DROP INDEX {quote(index["name"])}'))
+        table.create(db.session.connection())
+        columns = [c.name for c in table.columns if c.name.lower() in have]
+        values  = [f'CAST(ROUND({quote(name)} * 100) AS INTEGER)' if name.lower() in cents
+                   else quote(name) for name in columns]
+        db.session.execute(db.text(
+            f"INSERT INTO {table.name} ({', '.join(map(quote, columns))}) "
+            f"SELECT {', '.join(values)} FROM {old}"
+        ))
+        db.session.execute(db.text(f'DROP TABLE {old}'))
+        converted = True
+    if converted:
+        Draft.query.delete()   # wizard state in dollars; drafts are short-lived anyway
+    db.session.commit()
 
-with app.app_context():
-    db.create_all()
+def add_missing_columns():
+    """create_all() never alters existing tables; add any model columns they lack."""
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        have = {c['name'].lower() for c in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name.lower() not in have:
+                ddl = col.type.compile(dialect=db.engine.dialect)
+                db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl}'))
+    db.session.commit()
 
-federal_brackets = [
-    (0, 11000, 0.10),
-    (11000, 44725, 0.12),
-    (44725, 95375, 0.22),
-    (95375, 182100,0.24),
-    (182100,231250,0.32),
-    (231250,578125,0.35),
-    (578125,float('inf'),0.37),
+def add_missing_indexes():
+    """Likewise, create any model indexes an existing entries.db does not have yet."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+# One-time upgrades for existing entries.db files. They run in order and
+# SQLite's user_version pragma records how many have been applied.
+def _backfill_expenses():
+    # one pass over each table instead of lazy-loading entry.incomes per entry
+    date_maps = defaultdict(dict)
+    for entry_id, sender, d in db.session.query(Income.entry_id, Income.sender, Income.date):
+        date_maps[entry_id][sender] = d
+
+    rows = []
+    for entry_id, exp_csv, ts in db.session.query(Entry.id, Entry.exp_csv, Entry.timestamp):
+        rows += [
+            dict(entry_id=entry_id, sender=ex.sender, name=ex.name,
+                 amount_cents=ex.amount_cents, date=ex.date)
+            for ex in expenses_from_csv(exp_csv, date_maps[entry_id], ts.date())
+        ]
+    Expense.query.delete()
+    if rows:
+        db.session.execute(db.insert(Expense), rows)
+
+def _backfill_income_taxes():
+    incomes = Income.query.filter(Income.se_cents.is_(None)).all()
+    apply_taxes(incomes)
+
+def _backfill_ytd():
+    years = db.session.query(db.func.strftime('%Y', Income.date)).distinct()
+    recompute_ytd([int(y) for y, in years if y], rollup_deltas())
+
+MIGRATIONS = [
+    _backfill_expenses,
+    rebuild_monthly_rollup,
+    _backfill_income_taxes,
+    rebuild_monthly_rollup,
+    _backfill_ytd,
+    rebuild_monthly_rollup,
+    _backfill_ytd,   # again for taxable_before and TaxYear
+    rebuild_monthly_rollup,
+    _backfill_ytd,   # re-tax history under each year's own schedule
+    rebuild_monthly_rollup,
 ]
-louisiana_tax_rate = 0.04
-
-def calculate_federal_tax(income: float) -> float:
-    tax = 0.0
-    for lo, hi, rate in federal_brackets:
-        if income > lo:
-            taxable = min(income, hi) - lo
-            tax += taxable * rate
-        else:
-            break
-    return tax
+
+# These recompute everything from the rows, so however many pending steps
+# name them they run once, in this order, after the rest.
+FINAL_STEPS = (_backfill_ytd, rebuild_monthly_rollup)
+
+def run_migrations():
+    version = db.session.execute(db.text('PRAGMA user_version')).scalar()
+    pending = MIGRATIONS[version:]
+    if not pending:
+        return
+    for step in pending:
+        if step not in FINAL_STEPS:
+            step()
+    for step in FINAL_STEPS:
+        if step in pending:
+            step()
+    db.session.execute(db.text(f'PRAGMA user_version = {len(MIGRATIONS)}'))
+    db.session.commit()
+
+
+def set_sqlite_pragmas(pragmas, dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+_last_checkpoint = time.monotonic()
+
+def checkpoint_wal(app):
+    """Fold the WAL back into entries.db so it cannot grow without bound."""
+    with app.app_context(), db.engine.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA wal_checkpoint({app.config['SQLITE_CHECKPOINT_MODE']})")
+
+@bp.after_app_request
+def schedule_checkpoint(response):
+    global _last_checkpoint
+    interval = current_app.config['SQLITE_CHECKPOINT_INTERVAL']
+    if interval and time.monotonic() - _last_checkpoint >= interval:
+        _last_checkpoint = time.monotonic()
+        response.call_on_close(partial(checkpoint_wal, current_app._get_current_object()))
+    return response
+
+
 
 
 base_style = '''
@@ -140,7 +729,7 @@ base_style = '''
   }
 </style>
 '''
-nav_html = '<nav><a href="/">Home</a> | <a href="/saved-entries">Saved Entries</a> | <a href="/statements">Statements</a></nav>'
+nav_html = '<nav><a href="/">Home</a> | <a href="/saved-entries">Saved Entries</a> | <a href="/statements">Statements</a> | <a href="/scenarios">What If</a></nav>'
 
 index_html = base_style + '''
 <html>
@@ -172,10 +761,10 @@ tax_entry_html = base_style + '''
       <fieldset>
         <legend>Check {{ i+1 }}</legend>
         <label>Sender:
-          <input name="sender_{{i}}">
+          <input name="sender_{{i}}" required>
         </label>
         <label>Gross:
-          <input name="Gross_{{i}}" type="number" step="0.01">
+          <input name="Gross_{{i}}" type="number" step="0.01" required>
         </label>
         <label>Type:
           <select name="type_{{i}}">
@@ -221,8 +810,7 @@ show_taxes_html = base_style + '''
     <h3>Components</h3>
     <canvas id="taxChart" width="200" height="200" style="margin:auto;display:block;"></canvas>
     <form method="post" action="/expense-entry">
-      <input type="hidden" name="tax_csv"  value="{{ csv }}">
-      <input type="hidden" name="exp_csv"  value="{{ exp_csv }}">   <!-- NEW -->
+      <input type="hidden" name="draft_id" value="{{ draft_id }}">
       <input type="hidden" name="num_checks" value="{{ rows|length }}">
       <button type="submit">Next</button>
     </form>
@@ -251,28 +839,30 @@ expense_entry_html = base_style + '''
   <body>
 ''' + nav_html + '''
     <h2>Enter Expenses</h2>
+    <p>Enter your expenses now or later. You can always come back and add or modify your expenses.</p>
     <form method="post" action="/show-final" id="expForm">
-      <input type="hidden" name="tax_csv" value="{{ tax_csv }}">
-    {% set saved = session.get('exp_data', {}) %}
+      <input type="hidden" name="draft_id" value="{{ draft_id }}">
   {% for i in range(num_checks) %}
     {% set cnt = (saved.get('count_' ~ i|string) or 1) | int %}
     <fieldset>
-      <legend>Check {{ i+1 }}</legend>
+      <legend>Expenses for step 1: {{ i+1 }}</legend>
       <input type="hidden" id="count_{{ i }}" name="count_{{ i }}" value="{{ cnt }}">
       <div id="expenses_{{ i }}">
-        {% for j in range(cnt) %}
-          <label>Name:
-            <input name="exp_name_{{ i }}_{{ j }}"
-                  value="{{ saved.get('exp_name_' ~ i ~ '_' ~ j, '') }}"
-                  required>
-          </label>
-          <label>Amount:
-            <input name="exp_amt_{{ i }}_{{ j }}" type="number" step="0.01"
-                  value="{{ saved.get('exp_amt_' ~ i ~ '_' ~ j, '') }}"
-                  required>
-          </label>
-          <button type="button" onclick="removeExpense(this)">Remove</button>
-        {% endfor %}
+  {% for j in range(cnt) %}
+    <div class="expense-row" data-check="{{ i }}">
+      <label>Name:
+        <input name="exp_name_{{ i }}_{{ j }}"
+              value="{{ saved.get('exp_name_' ~ i ~ '_' ~ j, '') }}">
+      </label>
+      <label>Amount:
+        <input name="exp_amt_{{ i }}_{{ j }}" type="number" step="0.01"
+              value="{{ saved.get('exp_amt_' ~ i ~ '_' ~ j, '') }}">
+      </label>
+      <button type="button" onclick="removeExpense(this)">Remove</button>
+    </div>
+  {% endfor %}
+</div>
+
     </div>
     <button type="button" onclick="addExpense({{ i }})">Add Expense</button>
   </fieldset>
@@ -312,30 +902,29 @@ expense_entry_html = base_style + '''
     });
 
      function addExpense(i) {
-        const cont = document.getElementById('expenses_' + i);
-        const countInput = document.getElementById('count_' + i);
-        let cnt = parseInt(countInput.value, 10);
-        const rowHtml = `
-          <div class="expense-row" data-check="${i}">
-            <label>Name:   <input name="exp_name_${i}_${cnt}" required></label>
-            <label>Amount: <input name="exp_amt_${i}_${cnt}" type="number" step="0.01" required></label>
-            <button type="button" onclick="removeExpense(this)">Remove</button>
-          </div>`;
-        cont.insertAdjacentHTML('beforeend', rowHtml);
-        countInput.value = ++cnt;
-      }
+  const cont = document.getElementById('expenses_' + i);
+  const countInput = document.getElementById('count_' + i);
+  let cnt = parseInt(countInput.value, 10);
+  const rowHtml = `
+    <div class="expense-row" data-check="${i}">
+      <label>Name:   <input name="exp_name_${i}_${cnt}"></label>
+      <label>Amount: <input name="exp_amt_${i}_${cnt}" type="number" step="0.01"></label>
+      <button type="button" onclick="removeExpense(this)">Remove</button>
+    </div>`;
+  cont.insertAdjacentHTML('beforeend', rowHtml);
+  countInput.value = ++cnt;
+}
 
       function removeExpense(btn) {
-        const row = btn.closest('.expense-row');
-        const i = row.dataset.check;
-        row.remove();
-
-        // update the hidden counter
-        const newCount = document.querySelectorAll(
-          `#expenses_${i} .expense-row`
-        ).length;
-        document.getElementById('count_' + i).value = newCount;
-      }
+  const row = btn.closest('.expense-row');
+  const i   = row.dataset.check;
+  row.remove();
+  // update the counter so that show-final skips entirely if zero
+  const newCount = document.querySelectorAll(
+    `#expenses_${i} .expense-row`
+  ).length;
+  document.getElementById('count_' + i).value = newCount;
+}
     </script>
   </body>
 </html>
@@ -399,9 +988,10 @@ final_html = base_style + '''
       <button type="button" onclick="saveEntry()">Save Entry</button>
       <button formaction="/download-final" formmethod="post">Export to Excel</button>
 
-      <input type="hidden" name="tax_csv"   value="{{ tax_csv }}">
-      <input type="hidden" name="exp_csv"   value="{{ exp_csv }}">
-      <input type="hidden" name="final_csv" value="{{ final_csv }}">
+      <input type="hidden" name="draft_id"  value="{{ draft_id }}">
+      {% if entry_id %}
+        <input type="hidden" name="entry_id" value="{{ entry_id }}">
+      {% endif %}
     </form>
 
     <div class="chart-container">
@@ -515,1718 +1105,749 @@ statements_html = base_style + nav_html + '''
         </select>
       </label>
     </form>
-    <form style="margin-bottom:1em;" action="{{ url_for('download_statements') }}" method="get">
+    <form style="margin-bottom:1em;" action="{{ url_for('main.download_statements') }}" method="get">
       <input type="hidden" name="type" value="{{ filter_type }}">
       <button type="submit">Export Statements to Excel</button>
+      <button type="button" onclick="exportInBackground()">Export in Background</button>
+      <span id="exportStatus"></span>
     </form>
 
     {% if not summary %}
       <p><em>No data to show.</em></p>
     {% else %}
       {% for row in summary %}
-        <details open style="margin-bottom:2em;">
+        <details class="month" data-month="{{ row.month }}" style="margin-bottom:2em;">
           <summary style="font-size:1.1em; cursor:pointer;">
-            {{ row.month.strftime('%Y-%m') }}
-            — Income: ${{ '%.2f'|format(row.inc) }}
-            | Expenses: ${{ '%.2f'|format(row.exp) }}
-            | Taxes Due: ${{ '%.2f'|format(row.tax) }}
+            {{ row.month }}
+            — Income: ${{ row.inc|dollars }}
+            | Expenses: ${{ row.exp|dollars }}
+            | Taxes Due: ${{ row.tax|dollars }}
           </summary>
-          <div style="padding: 0.5em 1em;">
-            <h4>Incomes this month</h4>
-            <table>
-              <tr>
-                <th>Date</th><th>Sender</th><th>Type</th><th>Gross</th><th>Taxes</th><th>Entry</th>
-              </tr>
-              {% for it in inc_groups[row.month] %}
-                <tr>
-                  <td>{{ it.date.strftime('%Y-%m-%d') }}</td>
-                  <td>{{ it.sender }}</td>
-                  <td>{{ it.type }}</td>
-                  <td>${{ '%.2f'|format(it.Gross) }}</td>
-                  <td>${{ '%.2f'|format(it.taxes_due) }}</td>
-                  <td><a href="{{ url_for('view_entry', entry_id=it.entry_id) }}">View</a></td>
-                </tr>
-              {% endfor %}
-            </table>
-
-            <h4 style="margin-top:1em;">Expenses this month</h4>
+          <div class="month-detail" style="padding: 0.5em 1em;"><em>Loading…</em></div>
+        </details>
+      {% endfor %}
+
+      <h2>Yearly Summary</h2>
+      <table>
+        <tr><th>Year</th><th>Total Gross</th><th>Total Expenses</th><th>Total Taxes</th></tr>
+        {% for y in yearly %}
+          <tr>
+            <td>{{ y.year }}</td>
+            <td>${{ y.inc|dollars }}</td>
+            <td>${{ y.exp|dollars }}</td>
+            <td>${{ y.tax|dollars }}</td>
+          </tr>
+        {% endfor %}
+      </table>
+    {% endif %}
+
+    <script>
+      async function exportInBackground() {
+        const status = document.getElementById('exportStatus');
+        let job = await (await fetch(`{{ url_for('main.download_statements') }}?async=1&type=`
+                                     + encodeURIComponent({{ filter_type|tojson }}))).json();
+        while (job.status === 'queued' || job.status === 'running') {
+          status.textContent = `Building… ${Math.round(job.progress * 100)}%`;
+          await new Promise(r => setTimeout(r, 1000));
+          job = await (await fetch(job.status_url)).json();
+        }
+        status.textContent = job.status === 'done' ? '' : 'Export failed.';
+        if (job.status === 'done') window.location = job.download_url;
+      }
+
+      // detail rows are only fetched for the months the user expands
+      document.querySelectorAll('details.month').forEach(d => {
+        d.addEventListener('toggle', async () => {
+          if (!d.open || d.dataset.loaded) return;
+          d.dataset.loaded = '1';
+          const url = `{{ url_for('main.statement_month', month='MONTH') }}`
+                        .replace('MONTH', d.dataset.month)
+                    + '?type=' + encodeURIComponent({{ filter_type|tojson }});
+          const resp = await fetch(url);
+          d.querySelector('.month-detail').innerHTML = await resp.text();
+        });
+      });
+    </script>
+  </body>
+</html>
+'''
+
+statement_month_html = '''
+<h4>Incomes this month</h4>
+<table>
+  <tr>
+    <th>Date</th><th>Sender</th><th>Type</th><th>Gross</th><th>Taxes</th><th>Entry</th>
+  </tr>
+  {% for it in incomes %}
+    <tr>
+      <td>{{ it.date.strftime('%Y-%m-%d') }}</td>
+      <td>{{ it.sender }}</td>
+      <td>{{ it.type }}</td>
+      <td>${{ it.gross_cents|dollars }}</td>
+      <td>${{ it.tax_cents|dollars }}</td>
+      <td><a href="{{ url_for('main.view_entry', entry_id=it.entry_id) }}">View</a></td>
+    </tr>
+  {% endfor %}
+</table>
+
+<h4 style="margin-top:1em;">Expenses this month</h4>
 <table>
   <tr><th>Date</th><th>Sender</th><th>Expense</th><th>Amount</th><th>Entry</th></tr>
-  {% for ex in exp_groups[row.month] %}
+  {% for ex in expenses %}
   <tr>
-    <!-- now use ex.date -->
     <td>{{ ex.date.strftime('%Y-%m-%d') }}</td>
     <td>{{ ex.sender }}</td>
     <td>{{ ex.name }}</td>
-    <td>${{ '%.2f'|format(ex.amt) }}</td>
-    <td><a href="{{ url_for('view_entry', entry_id=ex.entry_id) }}">View</a></td>
+    <td>${{ ex.amount_cents|dollars }}</td>
+    <td><a href="{{ url_for('main.view_entry', entry_id=ex.entry_id) }}">View</a></td>
   </tr>
   {% endfor %}
 </table>
-          </div>
-        </details>
-      {% endfor %}
+'''
 
-      <h2>Yearly Summary</h2>
+saved_entries_html = base_style + nav_html + '''
+<h2>Saved Entries</h2>
+<ul>
+  {% for e in entries %}
+    <li>
+      <strong>{{ e.title }}</strong>
+      &nbsp;(<small>{{ e.timestamp.strftime('%Y-%m-%d') }}</small>)
+      [<a href="{{ url_for('main.view_entry', entry_id=e.id) }}">View/Edit</a>]
+      [<a href="{{ url_for('main.download_entry', entry_id=e.id) }}">Download</a>]
+      <form action="{{ url_for('main.delete_entry', entry_id=e.id) }}"
+            method="post" style="display:inline;margin-left:8px;">
+        <button type="submit">Delete</button>
+      </form>
+    </li>
+  {% endfor %}
+</ul>
+<p>
+  {% if not first_page %}<a href="{{ url_for('main.saved_entries') }}">&laquo; Newest</a>{% endif %}
+  {% if next_cursor %}<a href="{{ url_for('main.saved_entries', before=next_cursor) }}">Older &raquo;</a>{% endif %}
+</p>
+'''
+
+scenarios_html = base_style + '''
+<html>
+  <head>
+    <title>What If</title>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+  </head>
+  <body>
+''' + nav_html + '''
+    <h2>What-If Scenarios</h2>
+    <form method="get">
+      <fieldset>
+        <legend>Checks</legend>
+        <label>Saved entry ID: <input name="entry_id" type="number" min="1" value="{{ args.entry_id or '' }}"></label>
+        <label>or every check of year:
+          <select name="year">
+            <option value=""></option>
+            {% for y in years %}
+              <option value="{{ y }}" {% if args.year == y|string %}selected{% endif %}>{{ y }}</option>
+            {% endfor %}
+          </select>
+        </label>
+      </fieldset>
+      <fieldset>
+        <legend>Grid (comma separated; start:stop:step for a range)</legend>
+        <label>Gross multipliers: <input name="multipliers" value="{{ args.multipliers or '1' }}" placeholder="0.8:1.2:0.05"></label>
+        <label>Tax years' brackets (blank: each check's own): <input name="schedules" value="{{ args.schedules or '' }}" placeholder="2024,2025"></label>
+        <label>State rates (blank: the schedule's): <input name="state_rates" value="{{ args.state_rates or '' }}" placeholder="0.03,0.04"></label>
+      </fieldset>
+      <button type="submit">Run</button>
+    </form>
+
+    {% if error %}
+      <p><strong>{{ error }}</strong></p>
+    {% elif result %}
+      <h3>{{ result.checks }} checks, {{ result.scenarios|length }} scenarios</h3>
+      <p>As stored: gross ${{ result.baseline.gross|dollars }},
+         taxes ${{ result.baseline.total|dollars }}, net ${{ result.baseline.net|dollars }}</p>
+      <canvas id="scenarioChart" height="120"></canvas>
       <table>
-        <tr><th>Year</th><th>Total Gross</th><th>Total Expenses</th><th>Total Taxes</th></tr>
-        {% for y in yearly %}
+        <tr>
+          <th>Multiplier</th><th>Brackets</th><th>State Rate</th><th>Gross</th><th>Self-EE Tax</th>
+          <th>Fed Tax</th><th>State Tax</th><th>Total Tax</th><th>Net</th><th>Net Change</th>
+        </tr>
+        {% for row in result.scenarios[:table_rows] %}
           <tr>
-            <td>{{ y.year }}</td>
-            <td>${{ '%.2f'|format(y.inc_total) }}</td>
-            <td>${{ '%.2f'|format(y.exp_total) }}</td>
-            <td>${{ '%.2f'|format(y.tax_total) }}</td>
+            <td>{{ row.multiplier }}</td>
+            <td>{{ row.schedule }}</td>
+            <td>{{ row.state_rate if row.state_rate is not none else 'schedule' }}</td>
+            <td>${{ row.gross|dollars }}</td>
+            <td>${{ row.se|dollars }}</td>
+            <td>${{ row.fed|dollars }}</td>
+            <td>${{ row.state|dollars }}</td>
+            <td>${{ row.total|dollars }}</td>
+            <td>${{ row.net|dollars }}</td>
+            <td>${{ row.net_change|dollars }}</td>
           </tr>
         {% endfor %}
       </table>
+      {% if result.scenarios|length > table_rows %}
+        <p><em>First {{ table_rows }} scenarios shown; POST the same grid to /api/v1/scenarios for all of them.</em></p>
+      {% endif %}
+      <script>
+        const chart = {{ result.chart|tojson }};
+        new Chart(document.getElementById('scenarioChart'), {
+          type: 'line',
+          data: {
+            labels:   chart.multipliers,
+            datasets: chart.series.map(s => ({label: s.label, data: s.net.map(c => c / 100)})),
+          },
+          options: {scales: {x: {title: {display: true, text: 'Gross multiplier'}},
+                             y: {title: {display: true, text: 'Net ($)'}}}},
+        });
+      </script>
     {% endif %}
   </body>
 </html>
 '''
 
+# every page, registered by name so Jinja parses and compiles each one once
+TEMPLATES = {
+    'index.html':           index_html,
+    'tax_entry.html':       tax_entry_html,
+    'show_taxes.html':      show_taxes_html,
+    'expense_entry.html':   expense_entry_html,
+    'final.html':           final_html,
+    'saved_entries.html':   saved_entries_html,
+    'statements.html':      statements_html,
+    'statement_month.html': statement_month_html,
+    'scenarios.html':       scenarios_html,
+}
+
+template_stats      = defaultdict(lambda: {'count': 0, 'seconds': 0.0})
+template_stats_lock = threading.Lock()
+
+def load_templates(app, cache_dir=None):
+    """Serve TEMPLATES by name and compile every one of them now rather than on first use."""
+    cache_dir = cache_dir or app.config['TEMPLATE_BYTECODE_CACHE']
+    app.jinja_loader = DictLoader(TEMPLATES)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.jinja_env.cache.clear()   # recompile anything loaded before this call
+    for name in TEMPLATES:
+        app.jinja_env.get_template(name)
+
+def start_render_timer(sender, template, context, **extra):
+    g.setdefault('render_started', []).append(time.perf_counter())
+
+def record_render_time(sender, template, context, **extra):
+    elapsed = time.perf_counter() - g.render_started.pop()
+    with template_stats_lock:
+        stats = template_stats[template.name]
+        stats['count']   += 1
+        stats['seconds'] += elapsed
+
+@bp.route('/stats/templates')
+def template_render_stats():
+    with template_stats_lock:
+        return {
+            name: dict(stats, avg_ms=round(stats['seconds'] / stats['count'] * 1000, 3))
+            for name, stats in template_stats.items()
+        }
+
+@bp.cli.command('compile-templates')
+@click.argument('cache_dir', default=os.path.join(basedir, 'template_cache'))
+def compile_templates(cache_dir):
+    """Write Jinja bytecode for every template into CACHE_DIR (bundled by index.spec)."""
+    load_templates(current_app, cache_dir)
+    print(f'compiled {len(TEMPLATES)} templates into {cache_dir}')
+
+# ---- request metrics -------------------------------------------------------
+# Every request records its wall time, the SQL statements it ran (counted by
+# engine events) and the size of its response, per endpoint. /metrics serves
+# the totals, plus the template render stats, in Prometheus text format.
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_stats = defaultdict(lambda: {
+    'count': 0, 'seconds': 0.0, 'sql_count': 0, 'sql_seconds': 0.0, 'bytes': 0,
+    'buckets': [0] * len(REQUEST_BUCKETS),
+})
+request_status_counts = defaultdict(int)   # (endpoint, method, status) -> requests
+request_stats_lock    = threading.Lock()
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    # queries from background export jobs have no request to charge them to
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count   += 1
+        g.sql_seconds += elapsed
+
+@bp.before_app_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_count   = 0
+    g.sql_seconds = 0.0
+
+class CountedBody:
+    """
+    A response body passed through chunk by chunk, its size in bytes booked
+    to `endpoint` when the server closes it. That is the one hook every body
+    gets: a direct-passthrough (send_file) body goes out as is, so the
+    response's call_on_close() functions never run for it.
+    """
+
+    def __init__(self, body, endpoint):
+        self.body     = body
+        self.endpoint = endpoint
+        self.size     = 0
+        self.closed   = False
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if hasattr(self.body, 'close'):
+            self.body.close()
+        with request_stats_lock:
+            request_stats[self.endpoint]['bytes'] += self.size
+
+@bp.after_app_request
+def record_request_metrics(response):
+    elapsed  = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unmatched'
+    # a streamed body has no length yet: count it as it goes out rather than
+    # collecting it here, which would hold back every byte until it was done
+    size = response.content_length
+    if size is None:
+        response.response = CountedBody(response.response, endpoint)
+    with request_stats_lock:
+        stats = request_stats[endpoint]
+        stats['count']       += 1
+        stats['seconds']     += elapsed
+        stats['sql_count']   += g.sql_count
+        stats['sql_seconds'] += g.sql_seconds
+        stats['bytes']       += size or 0
+        for k, bound in enumerate(REQUEST_BUCKETS):
+            if elapsed <= bound:
+                stats['buckets'][k] += 1   # cumulative: every bucket this request fits in
+        request_status_counts[(endpoint, request.method, response.status_code)] += 1
+
+    threshold = current_app.config['SLOW_REQUEST_SECONDS']
+    if threshold is not None and elapsed >= threshold:
+        current_app.logger.warning(
+            'slow request %s %s: %.3fs, %d queries (%.3fs in SQL), %s bytes',
+            request.method, request.full_path.rstrip('?'), elapsed, g.sql_count, g.sql_seconds,
+            'streamed' if size is None else size)
+    return response
+
+def prometheus_lines(name, kind, help_text, samples, suffix=''):
+    """# HELP/# TYPE header plus one `name+suffix{labels} value` line per sample."""
+    yield f'# HELP {name} {help_text}'
+    yield f'# TYPE {name} {kind}'
+    for labels, value in samples:
+        label_str = ','.join(f'{k}="{v}"' for k, v in labels.items())
+        yield f'{name}{suffix}{{{label_str}}} {value}' if labels else f'{name}{suffix} {value}'
+
+@bp.route('/metrics')
+def metrics():
+    with request_stats_lock, template_stats_lock:
+        by_endpoint = {ep: dict(st, buckets=list(st['buckets'])) for ep, st in request_stats.items()}
+        statuses    = dict(request_status_counts)
+        templates   = {name: dict(st) for name, st in template_stats.items()}
+
+    # buckets are kept cumulative (each counts requests <= its bound), as the format wants
+    buckets = [({'endpoint': ep, 'le': bound}, n)
+               for ep, st in by_endpoint.items()
+               for bound, n in zip(REQUEST_BUCKETS + ('+Inf',), st['buckets'] + [st['count']])]
+
+    out = []
+    out += prometheus_lines('taxcalc_requests_total', 'counter', 'Requests served.',
+        [({'endpoint': ep, 'method': m, 'status': s}, n) for (ep, m, s), n in statuses.items()])
+    out += prometheus_lines('taxcalc_request_duration_seconds', 'histogram', 'Request wall time.',
+        buckets, suffix='_bucket')
+    out += [f'taxcalc_request_duration_seconds_sum{{endpoint="{ep}"}} {st["seconds"]}' for ep, st in by_endpoint.items()]
+    out += [f'taxcalc_request_duration_seconds_count{{endpoint="{ep}"}} {st["count"]}' for ep, st in by_endpoint.items()]
+    out += prometheus_lines('taxcalc_request_sql_queries_total', 'counter', 'SQL statements run by requests.',
+        [({'endpoint': ep}, st['sql_count']) for ep, st in by_endpoint.items()])
+    out += prometheus_lines('taxcalc_request_sql_seconds_total', 'counter', 'Time requests spent in SQL.',
+        [({'endpoint': ep}, st['sql_seconds']) for ep, st in by_endpoint.items()])
+    out += prometheus_lines('taxcalc_response_bytes_total', 'counter', 'Response body bytes.',
+        [({'endpoint': ep}, st['bytes']) for ep, st in by_endpoint.items()])
+    cache = current_app.extensions['statements_cache'].cache_info()
+    out += prometheus_lines('taxcalc_statements_cache_hits_total', 'counter',
+        'Statements views served from the cache.', [({}, cache.hits)])
+    out += prometheus_lines('taxcalc_statements_cache_misses_total', 'counter',
+        'Statements views that had to be computed.', [({}, cache.misses)])
+    out += prometheus_lines('taxcalc_statements_cache_entries', 'gauge',
+        'Results currently cached.', [({}, cache.currsize)])
+    out += prometheus_lines('taxcalc_template_renders_total', 'counter', 'Template renders.',
+        [({'template': name}, st['count']) for name, st in templates.items()])
+    out += prometheus_lines('taxcalc_template_render_seconds_total', 'counter', 'Time spent rendering templates.',
+        [({'template': name}, st['seconds']) for name, st in templates.items()])
+    return '\n'.join(out) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
  
-def se_tax(amount: float) -> float:
-    return amount * 0.153
-
-def fed_tax(amount: float) -> float:
-    return calculate_federal_tax(amount)
-
-def state_tax(amount: float) -> float:
-    return amount * louisiana_tax_rate
-
-def show_final_context(tax_csv, exp_csv, final_csv):
-    df_tax = pd.read_csv(StringIO(tax_csv))
-    comp_labels = ['Self-EE','Fed','State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
+TAX_COLUMNS = ['Sender','Type','Date','Gross','Self-EE Tax','Fed Tax','State Tax','Total Tax','Net']
+CHECK_KEYS  = ['sender','type','date','gross','se','fed','state','total','net']
+MONEY_KEYS  = CHECK_KEYS[3:]   # integer cents in a draft
+
+@bp.app_template_filter('dollars')
+def dollars_filter(cents):
+    return dollars(cents)
+
+def check_row(check, keys=CHECK_KEYS):
+    """A draft check as a table/CSV row, money as exact dollar strings."""
+    return [dollars(check[k]) if k in MONEY_KEYS else check[k] for k in keys]
+
+def new_draft(checks, expenses=()):
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['DRAFT_TTL'])
+    Draft.query.filter(Draft.updated_at < cutoff).delete()
+    draft = Draft(id=uuid.uuid4().hex, checks=checks, expenses=list(expenses))
+    db.session.add(draft)
+    db.session.commit()
+    return draft
+
+def load_draft():
+    """
+    The form's draft. A saved entry's page posts its entry_id instead: the
+    draft is only built from the stored rows once the entry is saved again
+    or exported, and never written, as neither changes it.
+    """
+    if request.form.get('draft_id'):
+        return Draft.query.get_or_404(request.form['draft_id'])
+    entry_id = request.form.get('entry_id', type=int)
+    if entry_id is None:
+        abort(400)
+    Entry.query.get_or_404(entry_id)
+    return stored_draft(entry_id)
+
+def check_from_income(inc):
+    return {
+        'sender': inc.sender,
+        'type':   inc.income_type,
+        'date':   inc.date.isoformat() if inc.date else None,
+        'gross':  inc.gross_cents,
+        'se':     inc.se_cents,
+        'fed':    inc.fed_cents,
+        'state':  inc.state_cents,
+        'total':  inc.tax_cents,
+        'net':    inc.net_cents,
+    }
+
+def stored_draft(entry_id):
+    """
+    An unsaved Draft of an entry as stored in Income/Expense, which every
+    read path goes by; the Entry's CSV copies are only what the wizard saw.
+    """
+    incomes  = Income.query.filter_by(entry_id=entry_id).order_by(Income.id)
+    expenses = Expense.query.filter_by(entry_id=entry_id).order_by(Expense.id)
+    return Draft(
+        checks=[check_from_income(inc) for inc in incomes],
+        expenses=[{'sender': ex.sender, 'name': ex.name, 'amount': ex.amount_cents} for ex in expenses],
+    )
+
+def draft_expense_rows(draft):
+    """[sender, name, amount, sender's net after all of their expenses] per expense, in cents."""
+    orig_nets = {c['sender']: c['net'] for c in draft.checks}
+    spent     = defaultdict(int)
+    for ex in draft.expenses:
+        spent[ex['sender']] += ex['amount']
+    return [
+        [ex['sender'], ex['name'], ex['amount'],
+         orig_nets.get(ex['sender'], 0) - spent[ex['sender']]]
+        for ex in draft.expenses
     ]
-    exp_lines = []
-    total_exp = 0.0
-    for i, sender in enumerate(df_tax['Sender']):
-        count = int(request.form.get(f'count_{i}', 0))
-        for j in range(count):
-            name = request.form[f'exp_name_{i}_{j}']
-            amt = float(request.form[f'exp_amt_{i}_{j}'])
-            exp_lines.append((sender, name, amt))
-            total_exp += amt
-    total_tax = df_tax['Total Tax'].sum()
-    total_net = df_tax['Net'].sum() - total_exp
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-    exp_rows = []
-    for sender, name, amt in exp_lines:
-        total_sender_exp = sum(amt for s, _, amt in exp_lines if s == sender)
-        net_profit = round(orig_nets[sender] - total_sender_exp, 2)
-        exp_rows.append([sender, name, amt, net_profit])
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    tax_cols = df_tax.columns.tolist()[1:]
+
+def draft_csvs(draft):
+    """The tax/expense/final CSV blobs an Entry keeps, in their historical layout."""
+    exp_rows = draft_expense_rows(draft)
+    def to_csv(header, rows):
+        buf = StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+        return buf.getvalue()
+    return (
+        to_csv(TAX_COLUMNS, [check_row(c) for c in draft.checks]),
+        to_csv(['Sender','Name','Amount','Net Profit'],
+               [[s, name, dollars(amt), dollars(net)] for s, name, amt, net in exp_rows]),
+        to_csv(['FinalNet'], [[dollars(r[3])] for r in exp_rows]),
+    )
+
+def final_totals(draft):
+    """(total tax, total expenses, final net) of a draft, in cents."""
+    total_exp = sum(ex['amount'] for ex in draft.expenses)
+    return (sum(c['total'] for c in draft.checks), total_exp,
+            sum(c['net'] for c in draft.checks) - total_exp)
+
+def final_context(draft, **extra):
+    checks = draft.checks
+    total_tax, total_exp, total_net = final_totals(draft)
     return dict(
-        tax_cols=tax_cols,
-        tax_rows=tax_rows,
-        exp_rows=exp_rows,
-        total_tax=round(total_tax,2),
-        total_exp=round(total_exp,2),
-        total_net=round(total_net,2),
-        comp_labels=comp_labels,
-        comp_data=comp_data,
-        tax_csv=tax_csv,
-        exp_csv=exp_csv,
-        final_csv=final_csv,
-        orig_nets=orig_nets
+        tax_cols=TAX_COLUMNS[1:],
+        tax_rows=[check_row(c, CHECK_KEYS[1:]) for c in checks],
+        exp_rows=[[s, name, dollars(amt), dollars(net)] for s, name, amt, net in draft_expense_rows(draft)],
+        total_tax=dollars(total_tax),
+        total_exp=dollars(total_exp),
+        total_net=dollars(total_net),
+        comp_labels=['Self-EE','Fed','State'],
+        # chart and in-page recalculation values, for display only
+        comp_data=[sum(c[k] for c in checks) / 100 for k in ('se', 'fed', 'state')],
+        orig_nets={c['sender']: c['net'] / 100 for c in checks},
+        draft_id=draft.id or '',
+        **extra
     )
 
-@app.route('/', methods=['GET'])
+@bp.route('/', methods=['GET'])
 def index():
-    return render_template_string(index_html)
+    return render_template('index.html')
 
-@app.route('/tax-entry', methods=['POST'])
+@bp.route('/tax-entry', methods=['POST'])
 def tax_entry():
     n     = int(request.form['num_checks'])
     today = date.today().isoformat()   # "2025-05-08"
-    return render_template_string(
-      tax_entry_html,
+    return render_template('tax_entry.html',
       n=n,
       edit=False,
       senders=[],
       grosses=[],
       today=today
     )
-from datetime import datetime
-import pandas as pd
 
-@app.route('/show-taxes', methods=['POST'])
+
+@bp.route('/show-taxes', methods=['POST'])
 def show_taxes():
     n = int(request.form['num_checks'])
-    records = []
-    sums = {'se': 0.0, 'fed': 0.0, 'st': 0.0}
 
+    senders, types, dates, grosses = [], [], [], []
     for i in range(n):
-        sender   = request.form[f'sender_{i}']
-        Gross    = float(request.form[f'Gross_{i}'])
-        inc_type = request.form[f'type_{i}']
-
-        date_str   = request.form[f'date_{i}']
-        check_date = datetime.fromisoformat(date_str).date()
-
-        if inc_type == '1099-NEC':
-            se  = Gross * 0.153
-            fed = calculate_federal_tax(Gross)
-            st  = Gross * louisiana_tax_rate
-        else:
-            se = fed = st = 0.0
-
-        total_tax = se + fed + st
-        net       = Gross - total_tax
-
-        sums['se']  += se
-        sums['fed'] += fed
-        sums['st']  += st
-
-        records.append([
-            sender,
-            inc_type,
-            check_date,
-            round(Gross,    2),
-            round(se,       2),
-            round(fed,      2),
-            round(st,       2),
-            round(total_tax,2),
-            round(net,      2)
-        ])
+        date_str = request.form.get(f'date_{i}', '')
+        senders.append(request.form.get(f'sender_{i}', '').strip())
+        try:
+            grosses.append(to_cents(request.form.get(f'Gross_{i}', '0') or 0))
+            dates.append(datetime.fromisoformat(date_str).date() if date_str else None)
+        except ValueError:
+            abort(400)
+        types.append(request.form.get(f'type_{i}', ''))
+
+    # undated checks are saved as today's, so they are taxed as today's
+    tax_dates = [d or date.today() for d in dates]
+    wages, taxable = new_checks_ytd(tax_dates, types, grosses)
+    taxes = compute_taxes(grosses, types, wages, taxable, [d.year for d in tax_dates])
+    se, fed, st, total, net = (taxes[k].tolist() for k in ('se', 'fed', 'state', 'total', 'net'))
+
+    checks = []
+    for i in range(n):
+        checks.append({
+            'sender': senders[i],
+            'type':   types[i],
+            'date':   dates[i].isoformat() if dates[i] else None,
+            'gross':  grosses[i],
+            'se':     se[i],
+            'fed':    fed[i],
+            'state':  st[i],
+            'total':  total[i],
+            'net':    net[i],
+        })
+    draft = new_draft(checks)
 
-    df = pd.DataFrame(records, columns=[
-        'Sender','Type','Date',
-        'Gross','Self-EE Tax','Fed Tax','State Tax','Total Tax','Net'
-    ])
+    return render_template('show_taxes.html',
+        cols        = TAX_COLUMNS,
+        rows        = [check_row(c) for c in checks],
+        draft_id    = draft.id,
+        comp_labels = ['Self-EE','Fed','State'],
+        comp_data   = [sum(se) / 100, sum(fed) / 100, sum(st) / 100]
+    )
 
 
-import sys, os
-from datetime import datetime,date
-from flask import Flask, render_template_string, request, send_file, redirect, url_for, flash, session
-from flask_sqlalchemy import SQLAlchemy
-import pandas as pd
-from io import BytesIO, StringIO
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.chart import PieChart, Reference
-from collections import defaultdict
-if getattr(sys, 'frozen', False):
-    basedir = os.path.dirname(sys.executable)
-else:
-    basedir = os.path.abspath(os.path.dirname(__file__))
 
-db_path   = os.path.join(basedir, 'entries.db')
-saved_dir = os.path.join(basedir, 'saved_entries')
-os.makedirs(saved_dir, exist_ok=True)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'replace_with_real_secret'
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+@bp.route('/expense-entry', methods=['POST'])
+def expense_entry():
+    draft = load_draft()
+    num_checks = len(draft.checks)
+    senders = [c['sender'] for c in draft.checks]
 
-db = SQLAlchemy(app)
+    saved = {}
+    counts = {i: 0 for i in range(num_checks)}
+    for ex in draft.expenses:
+        if ex['sender'] in senders:
+            i = senders.index(ex['sender'])
+        else:
+            continue
+        j = counts[i]
+        saved[f'exp_name_{i}_{j}'] = ex['name']
+        saved[f'exp_amt_{i}_{j}']  = dollars(ex['amount'])
+        counts[i] += 1
 
-class Entry(db.Model):
-    id         = db.Column(db.Integer, primary_key=True)
-    title      = db.Column(db.String(255), nullable=False)   # <-- new!
-    timestamp  = db.Column(db.DateTime, default=datetime.utcnow)
-    tax_csv    = db.Column(db.Text, nullable=False)
-    exp_csv    = db.Column(db.Text, nullable=False)
-    final_csv  = db.Column(db.Text, nullable=False)
+    for i in range(num_checks):
+        saved[f'count_{i}'] = counts[i] or 1
 
-    incomes    = db.relationship(
-        'Income',
-        backref='entry',
-        cascade='all, delete-orphan'
+    return render_template('expense_entry.html',
+        draft_id=draft.id,
+        num_checks=num_checks,
+        senders=senders,
+        saved=saved
     )
 
-class Income(db.Model):
-    __tablename__ = 'income'
-    id          = db.Column(db.Integer, primary_key=True)
-    entry_id    = db.Column(
-        db.Integer,
-        db.ForeignKey('entry.id', ondelete='CASCADE'),
-        nullable=False
-    )
-    sender      = db.Column(db.String(80),  nullable=False)
-    Gross       = db.Column(db.Float,      nullable=False)
-    income_type = db.Column(db.String(20), nullable=False)
-    date        = db.Column(db.Date,       default=datetime.utcnow().date)
 
 
-with app.app_context():
-    db.create_all()
 
-federal_brackets = [
-    (0, 11000, 0.10),
-    (11000, 44725, 0.12),
-    (44725, 95375, 0.22),
-    (95375, 182100,0.24),
-    (182100,231250,0.32),
-    (231250,578125,0.35),
-    (578125,float('inf'),0.37),
-]
-louisiana_tax_rate = 0.04
-
-def calculate_federal_tax(income: float) -> float:
-    tax = 0.0
-    for lo, hi, rate in federal_brackets:
-        if income > lo:
-            taxable = min(income, hi) - lo
-            tax += taxable * rate
-        else:
-            break
-    return tax
+@bp.route('/show-final', methods=['POST'])
+def show_final():
+    draft = load_draft()
 
+    expenses = []
+    for i, check in enumerate(draft.checks):
+      cnt = int(request.form.get(f'count_{i}', 0))
+      for j in range(cnt):
+        name    = request.form.get(f'exp_name_{i}_{j}', '').strip()
+        amt_str = request.form.get(f'exp_amt_{i}_{j}', '').strip()
+        if not name or not amt_str:
+            continue    # ← skip any row where either field is blank
+        try:
+            expenses.append({'sender': check['sender'], 'name': name, 'amount': to_cents(amt_str)})
+        except ValueError:
+            abort(400)
 
-base_style = '''
-<style>
-  body { 
-    font-family: Arial, sans-serif;
-    padding: 20px;
-    background: #f4f7f9; color: #333; 
-    display: flex;
-    flex-direction:column;
-    align-items: center;
-    min-height: 100vh; 
-  }
+    draft.expenses = expenses
+    db.session.commit()
 
+    return render_template('final.html', **final_context(draft))
 
-  fieldset {
-    background: #fff;
-    padding: 10px;
-    border: 1px solid #ccc;
-    margin-bottom: 15px;
-    border-radius: 4px;
-  }
-
-  @media (prefers-color-scheme: dark) {
-    body { background: #121212; color: #e0e0e0; }
-    table, th, td { border-color: #444; }
-    input, button, .btn-link { background: #1f1f1f; color: #e0e0e0; border-color: #444; }
-    /* dark‐mode fieldsets now match inputs/buttons */
-    fieldset {
-      background: #1f1f1f !important;
-      border-color: #444;
-    }
-    nav a { color: #bb86fc; }
-  }
-
-  nav a, .btn-link, button {
-    background: #006d77;
-    color: #fff;
-    padding: 8px 12px;
-    margin: 5px;
-    border: none;
-    border-radius: 4px;
-    text-decoration: none;
-    cursor: pointer;
-  }
-  nav a:hover, button:hover, .btn-link:hover { background: #005f68; }
-
-  table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
-  th, td { border: 1px solid #ccc; padding: 8px; text-align: left; }
-  th { background: #006d77; color: #fff; }
-
-  label { display: block; margin: 5px 0; }
-  input { width: calc(100% - 14px); padding: 6px; border: 1px solid #ccc; border-radius: 4px; }
-    .chart-container {
-    display: flex;
-    justify-content: space-around;
-    align-items: flex-start;
-    gap: 20px;
-    margin-bottom: 20px;
-  }
-  .chart-block {
-    text-align: center;
-  }
-</style>
-'''
-nav_html = '<nav><a href="/">Home</a> | <a href="/saved-entries">Saved Entries</a> | <a href="/statements">Statements</a></nav>'
-
-index_html = base_style + '''
-<html>
-  <head><title>Step 1: Checks</title></head>
-  <body>
-''' + nav_html + '''
-    <h2>Louisana Tax and Budget Calculator</h2>
-    <h3>Enter the number of checks your entering:</h3>
-    <form method="post" action="/tax-entry">
-      <label>Checks: <input name="num_checks" type="number" min="1" value="1" required></label>
-      <button type="submit">Next</button>
-    </form>
-  </body>
-</html>
-'''
-
-tax_entry_html = base_style + '''
-<html>
-  <head><title>Step 2: Gross</title></head>
-  <body>
-''' + nav_html + '''
-    <h2>{% if edit %}Edit{% else %}Enter{% endif %} Gross Amounts</h2>
-    <form method="post" action="/show-taxes">
-      <input type="hidden" name="num_checks" value="{{ n }}">
-      {% if edit %}
-        <input type="hidden" name="tax_csv" value="{{ tax_csv }}">
-      {% endif %}
-      {% for i in range(n) %}
-      <fieldset>
-        <legend>Check {{ i+1 }}</legend>
-        <label>Sender:
-          <input name="sender_{{i}}" required>
-        </label>
-        <label>Gross:
-          <input name="Gross_{{i}}" type="number" step="0.01" required>
-        </label>
-        <label>Type:
-          <select name="type_{{i}}">
-            <option value="1099-NEC">1099-NEC</option>
-            <option value="W-2">W-2</option>
-            <option value="Retirement">Retirement</option>
-          </select>
-        </label>
-        <label>Date:
-          <input name="date_{{i}}" type="date" value="{{ today }}" />
-        </label>
-      </fieldset>
-
-      {% endfor %}
-      <button type="submit">Calculate Taxes</button>
-    </form>
-  </body>
-</html>
-'''
-
-show_taxes_html = base_style + '''
-<html>
-  <head>
-    <title>Step 3: Tax Breakdown</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-  </head>
-  <body>
-''' + nav_html + '''
-    <h2>Tax Breakdown</h2>
-    <!-- inside show_taxes_html -->
-    <table>
-      <tr>
-        {% for c in cols %}<th>{{ c }}</th>{% endfor %}
-      </tr>
-      {% for row in rows %}
-        <tr>
-          {% for v in row %}<td>{{ v }}</td>{% endfor %}
-        </tr>
-      {% endfor %}
-    </table>
-
-
-    <h3>Components</h3>
-    <canvas id="taxChart" width="200" height="200" style="margin:auto;display:block;"></canvas>
-    <form method="post" action="/expense-entry">
-      <input type="hidden" name="tax_csv"  value="{{ csv }}">
-      <input type="hidden" name="exp_csv"  value="{{ exp_csv }}">   <!-- NEW -->
-      <input type="hidden" name="num_checks" value="{{ rows|length }}">
-      <button type="submit">Next</button>
-    </form>
-    <script>
-      new Chart(document.getElementById('taxChart'), {
-        type: 'pie',
-        data: { labels: {{ comp_labels|tojson }}, datasets: [{ data: {{ comp_data|tojson }} }] },
-        options: { responsive: false }
-      });
-    </script>
-  </body>
-</html>
-'''
-expense_entry_html = base_style + '''
-<html>
-  <head>
-    <title>Step 4: Expenses</title>
-    <style>
-      /* keep your white fieldset in light mode and dark in dark-mode */
-      fieldset { background:#fff; padding:10px; border:1px solid #ccc; border-radius:4px; margin-bottom:15px; }
-      @media (prefers-color-scheme: dark) {
-        fieldset { background:#1f1f1f; border-color:#444; }
-      }
-    </style>
-  </head>
-  <body>
-''' + nav_html + '''
-    <h2>Enter Expenses</h2>
-    <p>Enter your expenses now or later. You can always come back and add or modify your expenses.</p>
-    <form method="post" action="/show-final" id="expForm">
-      <input type="hidden" name="tax_csv" value="{{ tax_csv }}">
-    {% set saved = session.get('exp_data', {}) %}
-  {% for i in range(num_checks) %}
-    {% set cnt = (saved.get('count_' ~ i|string) or 1) | int %}
-    <fieldset>
-      <legend>Expenses for step 1: {{ i+1 }}</legend>
-      <input type="hidden" id="count_{{ i }}" name="count_{{ i }}" value="{{ cnt }}">
-      <div id="expenses_{{ i }}">
-  {% for j in range(cnt) %}
-    <div class="expense-row" data-check="{{ i }}">
-      <label>Name:
-        <input name="exp_name_{{ i }}_{{ j }}"
-              value="{{ saved.get('exp_name_' ~ i ~ '_' ~ j, '') }}">
-      </label>
-      <label>Amount:
-        <input name="exp_amt_{{ i }}_{{ j }}" type="number" step="0.01"
-              value="{{ saved.get('exp_amt_' ~ i ~ '_' ~ j, '') }}">
-      </label>
-      <button type="button" onclick="removeExpense(this)">Remove</button>
-    </div>
-  {% endfor %}
-</div>
-
-    </div>
-    <button type="button" onclick="addExpense({{ i }})">Add Expense</button>
-  </fieldset>
-{% endfor %}
-
-      <button type="submit">Finish</button>
-    </form>
-
-    <script>
-    // Restore any saved entries from localStorage
-    document.addEventListener('DOMContentLoaded', () => {
-      const saved = JSON.parse(localStorage.getItem('exp_data')||'{}');
-      for (let key in saved) {
-        const el = document.querySelector(`[name="${key}"]`);
-        if (el) el.value = saved[key];
-      }
-      // fix counters
-      Object.keys(saved).forEach(k => {
-        if (k.startsWith('count_')) {
-          const i = k.split('_')[1];
-          document.getElementById('count_'+i).value = saved[k];
-        }
-      });
-    });
-
-    // Before leaving the page, write all expense inputs & counts into localStorage
-    window.addEventListener('beforeunload', () => {
-      const data = {};
-      document.querySelectorAll('#expForm [name]').forEach(el => {
-        if (el.name.startsWith('exp_name_') ||
-            el.name.startsWith('exp_amt_')  ||
-            el.name.startsWith('count_')) {
-          data[el.name] = el.value;
-        }
-      });
-      localStorage.setItem('exp_data', JSON.stringify(data));
-    });
-
-     function addExpense(i) {
-  const cont = document.getElementById('expenses_' + i);
-  const countInput = document.getElementById('count_' + i);
-  let cnt = parseInt(countInput.value, 10);
-  const rowHtml = `
-    <div class="expense-row" data-check="${i}">
-      <label>Name:   <input name="exp_name_${i}_${cnt}"></label>
-      <label>Amount: <input name="exp_amt_${i}_${cnt}" type="number" step="0.01"></label>
-      <button type="button" onclick="removeExpense(this)">Remove</button>
-    </div>`;
-  cont.insertAdjacentHTML('beforeend', rowHtml);
-  countInput.value = ++cnt;
-}
-
-      function removeExpense(btn) {
-  const row = btn.closest('.expense-row');
-  const i   = row.dataset.check;
-  row.remove();
-  // update the counter so that show-final skips entirely if zero
-  const newCount = document.querySelectorAll(
-    `#expenses_${i} .expense-row`
-  ).length;
-  document.getElementById('count_' + i).value = newCount;
-}
-    </script>
-  </body>
-</html>
-'''
-
-
-
-final_html = base_style + '''
-<html>
-  <head>
-    <title>Step 5: Summary</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-  </head>
-  <body>
-''' + nav_html + '''
-    <h2>Final Summary (Editable)</h2>
-    <form id="finalForm">
-      <h3>Tax Breakdown</h3>
-      <table>
-        <tr>{% for c in tax_cols %}<th>{{ c }}</th>{% endfor %}</tr>
-        {% for row in tax_rows %}
-          <tr>{% for v in row %}<td>{{ v }}</td>{% endfor %}</tr>
-        {% endfor %}
-      </table>
-
-      <h3>Expenses & Net Profit</h3>
-      <table id="expTable">
-        <thead>
-          <tr>
-            <th>Sender</th>
-            <th>Expense</th>
-            <th>Amount</th>
-            <th>Net After</th>
-            <th>Action</th>
-          </tr>
-        </thead>
-        <tbody>
-          {% for s,e,a,net_after in exp_rows %}
-            <tr data-sender="{{ s }}">
-              <td>{{ s }}</td>
-              <td><input name="exp_name_{{ loop.index0 }}" value="{{ e }}"></td>
-              <td><input name="exp_amt_{{ loop.index0 }}" value="{{ a }}" oninput="recalculate()"></td>
-              <td><input name="net_after_{{ loop.index0 }}" value="{{ net_after }}" readonly></td>
-              <td><button type="button" onclick="removeRow(this)">Remove</button></td>
-            </tr>
-          {% endfor %}
-        </tbody>
-        <tfoot>
-          <tr>
-            <th colspan="3">Final Net</th>
-            <th colspan="2" id="finalNetCell"><strong>${{ total_net }}</strong></th>
-          </tr>
-        </tfoot>
-      </table>
-
-      {% if not view_only %}
-        <button type="button" onclick="window.history.back()">Back</button>
-      {% endif %}      
-      <button type="button" onclick="addRow()">Add Expense</button>
-      <button type="button" onclick="recalculate()">Recalculate</button>
-      <button type="button" onclick="saveEntry()">Save Entry</button>
-      <button formaction="/download-final" formmethod="post">Export to Excel</button>
-
-      <input type="hidden" name="tax_csv"   value="{{ tax_csv }}">
-      <input type="hidden" name="exp_csv"   value="{{ exp_csv }}">
-      <input type="hidden" name="final_csv" value="{{ final_csv }}">
-    </form>
-
-    <div class="chart-container">
-  <div class="chart-block">
-    <h3>Tax Breakdown Pie</h3>
-    <canvas id="taxBreakdownChart" width="200" height="200"></canvas>
-  </div>
-  <div class="chart-block">
-    <h3>Overall Distribution</h3>
-    <canvas id="finalChart" width="200" height="200"></canvas>
-  </div>
-</div>
-    <script>
-      const origNet = {{ orig_nets|tojson }};
-
-      function recalculate() {
-        // Sequentially subtract each expense from its sender’s net
-        const running = {...origNet};
-        document.querySelectorAll('#expTable tbody tr[data-sender]').forEach(row => {
-          const sender = row.dataset.sender;
-          const idx    = row.querySelector('input[name^="exp_amt_"]').name.split('_').pop();
-          const amt    = parseFloat(row.querySelector(`input[name="exp_amt_${idx}"]`).value) || 0;
-          running[sender] -= amt;
-          row.querySelector(`input[name="net_after_${idx}"]`).value = running[sender].toFixed(2);
-        });
-
-        // Compute overall final net
-        let overall = Object.values(running).reduce((sum,v) => sum + v, 0);
-        document.getElementById('finalNetCell').innerHTML = `<strong>$${overall.toFixed(2)}</strong>`;
-      }
-
-      document.querySelectorAll('#expTable input[name^="exp_amt_"]')
-        .forEach(input => input.addEventListener('input', recalculate));
-      document.addEventListener('DOMContentLoaded', recalculate);
-
-      function removeRow(btn) { btn.closest('tr').remove(); recalculate(); }
-
-      function addRow() {
-        const tbody = document.querySelector('#expTable tbody');
-        const idx = tbody.rows.length;
-        const row = document.createElement('tr');
-        row.setAttribute('data-sender', '');
-        row.innerHTML = `
-          <td><input name="exp_sender_${idx}" placeholder="Sender"
-                    onchange="this.closest('tr').setAttribute('data-sender', this.value)"></td>
-          <td><input name="exp_name_${idx}" placeholder="Expense"></td>
-          <td><input name="exp_amt_${idx}" oninput="recalculate()"></td>
-          <td><input name="net_after_${idx}" readonly></td>
-          <td><button type="button" onclick="removeRow(this)">Remove</button></td>
-        `;
-        tbody.appendChild(row);
-        // immediately recalc so new row's net shows up
-        recalculate();
-      }
-
-    async function saveEntry() {
-        // ask the user for a name
-        const title = prompt("Enter a name for this entry:");
-        if (!title) return;  // user cancelled
-
-        const form = document.getElementById('finalForm');
-        const data = new FormData(form);
-        data.append('title', title);
-
-        const resp = await fetch('/save-entry', {
-          method: 'POST',
-          body: data,
-          headers: { 'X-Requested-With': 'XMLHttpRequest' }
-        });
-
-        if (resp.ok || resp.status===302) {
-          alert('Entry "' + title + '" saved successfully!');
-          // optionally redirect back to Saved Entries:
-          window.location = '/saved-entries';
-        } else {
-          alert('Save failed.');
-        }
-      }
-      new Chart(
-        document.getElementById('taxBreakdownChart'),
-        { type:'pie',
-          data:{ labels: {{ comp_labels|tojson }},
-                 datasets:[{ data: {{ comp_data|tojson }} }]},
-          options:{ responsive:false }
-        }
-      );
-      new Chart(
-        document.getElementById('finalChart'),
-        { type:'pie',
-          data:{ labels:['Tax','Expenses','Net'],
-                 datasets:[{ data:[{{ total_tax }},{{ total_exp }},{{ total_net }}] }]},
-          options:{ responsive:false }
-        }
-      );
-    </script>
-  </body>
-</html>
-'''
-statements_html = base_style + nav_html + '''
-<html>
-  <head><title>Income Statements</title></head>
-  <body>
-    <h2>Income & Expense Statements by Month</h2>
-
-    <form method="get" style="margin-bottom:1em;">
-      <label>Filter by type:
-        <select name="type" onchange="this.form.submit()">
-          {% for t in types %}
-            <option value="{{t}}" {% if t==filter_type %}selected{% endif %}>{{t}}</option>
-          {% endfor %}
-        </select>
-      </label>
-    </form>
-    <form style="margin-bottom:1em;" action="{{ url_for('download_statements') }}" method="get">
-      <input type="hidden" name="type" value="{{ filter_type }}">
-      <button type="submit">Export Statements to Excel</button>
-    </form>
-
-    {% if not summary %}
-      <p><em>No data to show.</em></p>
-    {% else %}
-      {% for row in summary %}
-        <details open style="margin-bottom:2em;">
-          <summary style="font-size:1.1em; cursor:pointer;">
-            {{ row.month.strftime('%Y-%m') }}
-            — Income: ${{ '%.2f'|format(row.inc) }}
-            | Expenses: ${{ '%.2f'|format(row.exp) }}
-            | Taxes Due: ${{ '%.2f'|format(row.tax) }}
-          </summary>
-          <div style="padding: 0.5em 1em;">
-            <h4>Incomes this month</h4>
-            <table>
-              <tr>
-                <th>Date</th><th>Sender</th><th>Type</th><th>Gross</th><th>Taxes</th><th>Entry</th>
-              </tr>
-              {% for it in inc_groups[row.month] %}
-                <tr>
-                  <td>{{ it.date.strftime('%Y-%m-%d') }}</td>
-                  <td>{{ it.sender }}</td>
-                  <td>{{ it.type }}</td>
-                  <td>${{ '%.2f'|format(it.Gross) }}</td>
-                  <td>${{ '%.2f'|format(it.taxes_due) }}</td>
-                  <td><a href="{{ url_for('view_entry', entry_id=it.entry_id) }}">View</a></td>
-                </tr>
-              {% endfor %}
-            </table>
-
-            <h4 style="margin-top:1em;">Expenses this month</h4>
-<table>
-  <tr><th>Date</th><th>Sender</th><th>Expense</th><th>Amount</th><th>Entry</th></tr>
-  {% for ex in exp_groups[row.month] %}
-  <tr>
-    <!-- now use ex.date -->
-    <td>{{ ex.date.strftime('%Y-%m-%d') }}</td>
-    <td>{{ ex.sender }}</td>
-    <td>{{ ex.name }}</td>
-    <td>${{ '%.2f'|format(ex.amt) }}</td>
-    <td><a href="{{ url_for('view_entry', entry_id=ex.entry_id) }}">View</a></td>
-  </tr>
-  {% endfor %}
-</table>
-          </div>
-        </details>
-      {% endfor %}
-
-      <h2>Yearly Summary</h2>
-      <table>
-        <tr><th>Year</th><th>Total Gross</th><th>Total Expenses</th><th>Total Taxes</th></tr>
-        {% for y in yearly %}
-          <tr>
-            <td>{{ y.year }}</td>
-            <td>${{ '%.2f'|format(y.inc_total) }}</td>
-            <td>${{ '%.2f'|format(y.exp_total) }}</td>
-            <td>${{ '%.2f'|format(y.tax_total) }}</td>
-          </tr>
-        {% endfor %}
-      </table>
-    {% endif %}
-  </body>
-</html>
-'''
-
- 
-def se_tax(amount: float) -> float:
-    return amount * 0.153
-
-def fed_tax(amount: float) -> float:
-    return calculate_federal_tax(amount)
-
-def state_tax(amount: float) -> float:
-    return amount * louisiana_tax_rate
-
-def show_final_context(tax_csv, exp_csv, final_csv):
-    df_tax = pd.read_csv(StringIO(tax_csv))
-    comp_labels = ['Self-EE','Fed','State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
-    ]
-    exp_lines = []
-    total_exp = 0.0
-    for i, sender in enumerate(df_tax['Sender']):
-        count = int(request.form.get(f'count_{i}', 0))
-        for j in range(count):
-            name = request.form[f'exp_name_{i}_{j}']
-            amt = float(request.form[f'exp_amt_{i}_{j}'])
-            exp_lines.append((sender, name, amt))
-            total_exp += amt
-    total_tax = df_tax['Total Tax'].sum()
-    total_net = df_tax['Net'].sum() - total_exp
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-    exp_rows = []
-    for sender, name, amt in exp_lines:
-        total_sender_exp = sum(amt for s, _, amt in exp_lines if s == sender)
-        net_profit = round(orig_nets[sender] - total_sender_exp, 2)
-        exp_rows.append([sender, name, amt, net_profit])
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    tax_cols = df_tax.columns.tolist()[1:]
-    return dict(
-        tax_cols=tax_cols,
-        tax_rows=tax_rows,
-        exp_rows=exp_rows,
-        total_tax=round(total_tax,2),
-        total_exp=round(total_exp,2),
-        total_net=round(total_net,2),
-        comp_labels=comp_labels,
-        comp_data=comp_data,
-        tax_csv=tax_csv,
-        exp_csv=exp_csv,
-        final_csv=final_csv,
-        orig_nets=orig_nets
-    )
-
-@app.route('/', methods=['GET'])
-def index():
-    return render_template_string(index_html)
-
-@app.route('/tax-entry', methods=['POST'])
-def tax_entry():
-    n     = int(request.form['num_checks'])
-    today = date.today().isoformat()   # "2025-05-08"
-    return render_template_string(
-      tax_entry_html,
-      n=n,
-      edit=False,
-      senders=[],
-      grosses=[],
-      today=today
-    )
-
-
-@app.route('/show-taxes', methods=['POST'])
-def show_taxes():
-    n = int(request.form['num_checks'])
-    records = []
-    sums = {'se': 0.0, 'fed': 0.0, 'st': 0.0}
-
-    SS_WAGE_BASE = 168_666
-    SS_RATE      = 0.124   # Social Security 12.4%
-    MED_RATE     = 0.029   # Medicare 2.9%
-
-    for i in range(n):
-        sender   = request.form.get(f'sender_{i}', '').strip()
-        gross    = float(request.form.get(f'Gross_{i}', '0') or 0)
-        inc_type = request.form.get(f'type_{i}', '')
-        date_str = request.form.get(f'date_{i}', '')
-        check_date = datetime.fromisoformat(date_str).date() if date_str else None
-
-        if inc_type == '1099-NEC':
-            med_tax = gross * MED_RATE
-            ss_tax  = min(gross, SS_WAGE_BASE) * SS_RATE
-            se      = ss_tax + med_tax
-
-            fed = calculate_federal_tax(gross)
-            st  = gross * louisiana_tax_rate
-        else:
-            se = fed = st = 0.0
-
-        total_tax = se + fed + st
-        net       = gross - total_tax
-
-        sums['se']  += se
-        sums['fed'] += fed
-        sums['st']  += st
-
-        records.append([
-            sender,
-            inc_type,
-            check_date,
-            round(gross,    2),
-            round(se,       2),
-            round(fed,      2),
-            round(st,       2),
-            round(total_tax,2),
-            round(net,      2)
-        ])
-
-    df = pd.DataFrame(records, columns=[
-        'Sender','Type','Date',
-        'Gross','Self-EE Tax','Fed Tax','State Tax',
-        'Total Tax','Net'
-    ])
-
-    return render_template_string(
-        show_taxes_html,
-        cols        = df.columns.tolist(),
-        rows        = df.values.tolist(),
-        csv         = df.to_csv(index=False),
-        exp_csv     = '',  # start fresh
-        comp_labels = ['Self-EE','Fed','State'],
-        comp_data   = [
-            round(sums['se'],  2),
-            round(sums['fed'], 2),
-            round(sums['st'],  2)
-        ]
-    )
-
-
-
-
-@app.route('/expense-entry', methods=['POST'])
-def expense_entry():
-    tax_csv = request.form['tax_csv']
-    exp_csv = request.form.get('exp_csv', '')
-    df_tax = pd.read_csv(StringIO(tax_csv))
-    num_checks = len(df_tax)
-    senders = df_tax['Sender'].tolist()
-
-    saved = {}
-    counts = {i: 0 for i in range(num_checks)}
-    if exp_csv:
-        df_exp = pd.read_csv(StringIO(exp_csv))
-        for _, row in df_exp.iterrows():
-            sender = row['Sender']
-            if sender in senders:
-                i = senders.index(sender)
-            else:
-                continue
-            j = counts[i]
-            saved[f'exp_name_{i}_{j}'] = row['Expense']
-            saved[f'exp_amt_{i}_{j}']  = str(row['Amount'])
-            counts[i] += 1
-
-    for i in range(num_checks):
-        saved[f'count_{i}'] = counts[i] or 1
-
-    return render_template_string(
-        expense_entry_html,
-        tax_csv=tax_csv,
-        num_checks=num_checks,
-        senders=senders,
-        saved=saved
-    )
-
-
-
-
-@app.route('/show-final', methods=['POST'])
-def show_final():
-   
-    exp_data = {}
-    df_tax = pd.read_csv(StringIO(request.form['tax_csv']))
-    for i, sender in enumerate(df_tax['Sender']):
-        cnt = int(request.form.get(f'count_{i}', 0))
-        exp_data[f'count_{i}'] = cnt
-        for j in range(cnt):
-            exp_data[f'exp_name_{i}_{j}'] = request.form.get(f'exp_name_{i}_{j}', '')
-            exp_data[f'exp_amt_{i}_{j}']  = request.form.get(f'exp_amt_{i}_{j}', '')
-    session['exp_data'] = exp_data
-
-    tax_csv = request.form['tax_csv']
-
-    df_tax = pd.read_csv(StringIO(tax_csv))
-
-    comp_labels = ['Self-EE', 'Fed', 'State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
-    ]
-
-    exp_lines = []
-    total_exp = 0.0
-
-    for i, sender in enumerate(df_tax['Sender']):
-      cnt = int(request.form.get(f'count_{i}', 0))
-      for j in range(cnt):
-        name    = request.form.get(f'exp_name_{i}_{j}', '').strip()
-        amt_str = request.form.get(f'exp_amt_{i}_{j}', '').strip()
-        if not name or not amt_str:
-            continue    # ← skip any row where either field is blank
-        amt = float(amt_str)
-        exp_lines.append((sender, name, amt))
-        total_exp += amt
-
-
-
-    total_tax = df_tax['Total Tax'].sum()
-    total_net = df_tax['Net'].sum() - total_exp
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-
-    exp_rows = []
-    for sender, name, amt in exp_lines:
-        total_sender_exp = sum(a for s,_,a in exp_lines if s == sender)
-        net_profit = round(orig_nets[sender] - total_sender_exp, 2)
-        exp_rows.append([sender, name, amt, net_profit])
-
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    tax_cols = df_tax.columns.tolist()[1:]
-
-    return render_template_string(
-        final_html,
-        tax_cols=tax_cols,
-        tax_rows=tax_rows,
-        exp_rows=exp_rows,
-        total_tax=round(total_tax,2),
-        total_exp=round(total_exp,2),
-        total_net=round(total_net,2),
-        comp_labels=comp_labels,
-        comp_data=comp_data,
-        tax_csv=tax_csv,
-        exp_csv=pd.DataFrame(exp_rows, columns=['Sender','Name','Amount','Net Profit']).to_csv(index=False),
-        final_csv=pd.DataFrame([[r[3]] for r in exp_rows], columns=['FinalNet']).to_csv(index=False),
-        orig_nets=orig_nets
-    )
-from io import StringIO
-
-@app.route('/save-entry', methods=['POST'])
-def save_entry():
-    title = request.form['title'].strip()
-    if not title:
-        flash("You must supply a name.")
-        return redirect(request.referrer or url_for('index'))
-
-    entry = Entry(
-        title     = title,
-        tax_csv   = request.form['tax_csv'],
-        exp_csv   = request.form['exp_csv'],
-        final_csv = request.form['final_csv']
-    )
-    db.session.add(entry)
-    db.session.flush()   # give us entry.id without committing
-
-    df_tax = pd.read_csv(StringIO(request.form['tax_csv']), parse_dates=['Date'])
-    for _, row in df_tax.iterrows():
-        db.session.add( Income(
-            entry_id    = entry.id,
-            sender      = row['Sender'],
-            Gross       = float(row['Gross']),
-            income_type = row['Type'],
-            date        = row['Date'].date()     # or row['Date'] if it’s already a date
-        ) )
-
-    db.session.commit()
-    flash(f'Entry "{title}" saved.')
-    return redirect(url_for('saved_entries'))
-
-
-
-@app.route('/delete-entry/<int:entry_id>', methods=['POST'])
-def delete_entry(entry_id):
-    Income.query.filter_by(entry_id=entry_id).delete()
-    entry = Entry.query.get_or_404(entry_id)
-    db.session.delete(entry)
-    db.session.commit()
-    flash(f"Deleted entry {entry.timestamp:%Y-%m-%d %H:%M:%S}")
-    return redirect(url_for('saved_entries'))
-
-@app.route('/saved-entries')
-def saved_entries():
-    entries = Entry.query.order_by(Entry.timestamp.desc()).all()
-    return render_template_string(
-        base_style + nav_html + '''
-<h2>Saved Entries</h2>
-<ul>
-  {% for e in entries %}
-    <li>
-      <strong>{{ e.title }}</strong>
-      &nbsp;(<small>{{ e.timestamp.strftime('%Y-%m-%d') }}</small>)
-      [<a href="{{ url_for('view_entry', entry_id=e.id) }}">View/Edit</a>]
-      [<a href="{{ url_for('download_entry', entry_id=e.id) }}">Download</a>]
-      <form action="{{ url_for('delete_entry', entry_id=e.id) }}"
-            method="post" style="display:inline;margin-left:8px;">
-        <button type="submit">Delete</button>
-      </form>
-    </li>
-  {% endfor %}
-</ul>
-''', entries=entries
-    )
-
-
-@app.route('/view-entry/<int:entry_id>', methods=['GET'])
-def view_entry(entry_id):
-    entry = Entry.query.get_or_404(entry_id)
-
-    df_tax = pd.read_csv(StringIO(entry.tax_csv))
-    try:
-        df_exp = pd.read_csv(StringIO(entry.exp_csv))
-    except pd.errors.EmptyDataError:
-        df_exp = pd.DataFrame(columns=['Sender','Name','Amount','Net Profit'])
-
-    comp_labels = ['Self-EE','Fed','State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
-    ]
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_exp['Net Profit'].sum()
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-
-    tax_cols = df_tax.columns.tolist()[1:]
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    exp_rows = df_exp[['Sender','Name','Amount','Net Profit']].values.tolist()
-
-    incomes = entry.incomes  # thanks to the backref
-    ctx = {
-        'tax_cols': tax_cols,
-        'tax_rows': tax_rows,
-        'exp_rows': exp_rows,
-        'comp_labels': comp_labels,
-        'comp_data': comp_data,
-        'total_tax': round(total_tax,2),
-        'total_exp': round(total_exp,2),
-        'total_net': round(total_net,2),
-        'tax_csv': entry.tax_csv,
-        'exp_csv': entry.exp_csv,
-        'final_csv': entry.final_csv,
-        'orig_nets': orig_nets,
-        'view_only': True,
-    }
-    return render_template_string(final_html, **ctx)
-
-@app.route('/download-final', methods=['POST'])
-def download_final():
-    df_tax   = pd.read_csv(StringIO(request.form['tax_csv']))
-    df_exp   = pd.read_csv(StringIO(request.form['exp_csv']))
-    df_final = pd.read_csv(StringIO(request.form['final_csv']))
-
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_final['FinalNet'].sum()
-
-    wb = Workbook()
-
-    ws1 = wb.active
-    ws1.title = 'Taxes'
-    for row in dataframe_to_rows(df_tax, index=False, header=True):
-        ws1.append(row)
-
-    ws2 = wb.create_sheet('Expenses & Net')
-    ws2.append(['Sender', 'Expense', 'Amount', 'Net After'])
-    for sender, name, amt, net_after in df_exp.values.tolist():
-        ws2.append([sender, name, amt, net_after])
-
-    ws3 = wb.create_sheet('Summary')
-    ws3.append(['Category', 'Value'])
-    ws3.append(['Total Tax', total_tax])
-    ws3.append(['Total Expenses', total_exp])
-    ws3.append(['Final Net', total_net])
-
-    pie1 = PieChart()
-    pie1.title = "Tax Breakdown"
-    labels = Reference(ws3, min_col=1, min_row=2, max_row=4)
-    data   = Reference(ws3, min_col=2, min_row=2, max_row=4)
-    pie1.add_data(data, titles_from_data=False)
-    pie1.set_categories(labels)
-    ws3.add_chart(pie1, "E2")
-
-    pie2 = PieChart()
-    pie2.title = "Overall Distribution"
-    pie2.add_data(data, titles_from_data=False)
-    pie2.set_categories(labels)
-    ws3.add_chart(pie2, "E20")
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-        out,
-        as_attachment=True,
-        download_name='report.xlsx',
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-
-@app.route('/statements')
-def statements():
-    all_types   = [r[0] for r in Income.query.with_entities(Income.income_type).distinct()]
-    types       = ['All'] + all_types
-    filter_type = request.args.get('type', 'All')
-
-    q = Income.query
-    if filter_type != 'All':
-        q = q.filter(Income.income_type == filter_type)
-    inc_objs = q.all()
-
-    inc_rows = []
-    for inc in inc_objs:
-        if inc.income_type == '1099-NEC':
-            se   = inc.Gross * 0.153
-            fed  = calculate_federal_tax(inc.Gross)
-            st   = inc.Gross * louisiana_tax_rate
-            tax_amt = round(se + fed + st, 2)
-        else:
-            tax_amt = 0.0
-
-        inc_rows.append({
-            'entry_id':  inc.entry_id,
-            'date':      inc.date,
-            'sender':    inc.sender,
-            'type':      inc.income_type,
-            'Gross':     inc.Gross,
-            'taxes_due': tax_amt
-        })
-
-    inc_df = pd.DataFrame(inc_rows)
-    for col, dtype in (('date','datetime64[ns]'),
-                       ('Gross','float64'),
-                       ('taxes_due','float64')):
-        if col not in inc_df:
-            inc_df[col] = pd.Series(dtype=dtype)
-
-    inc_df['date']  = pd.to_datetime(inc_df['date'])
-    inc_df['month'] = inc_df['date'].dt.to_period('M').dt.to_timestamp()
-    inc_df['year']  = inc_df['date'].dt.year
-
-    exp_rows = []
-    for entry in Entry.query.all():
-        if not entry.exp_csv.strip():
-            continue
-        df_exp = pd.read_csv(StringIO(entry.exp_csv))
-        date_map = {i.sender: i.date for i in entry.incomes}
-        for _, r in df_exp.iterrows():
-            d = date_map.get(r['Sender'], entry.timestamp.date())
-            exp_rows.append({
-                'entry_id': entry.id,
-                'date':      d,
-                'sender':    r['Sender'],
-                'name':      r['Name'],
-                'amt':       r['Amount']
-            })
-
-    exp_df = pd.DataFrame(exp_rows)
-    if not exp_df.empty:
-        exp_df['date']  = pd.to_datetime(exp_df['date'])
-        exp_df['month'] = exp_df['date'].dt.to_period('M').dt.to_timestamp()
-        exp_df['year']  = exp_df['date'].dt.year
-    else:
-        for col in ('date','month','year','amt'):
-            exp_df[col] = pd.Series(dtype='datetime64[ns]' if col!='amt' else 'float64')
-
-    months  = sorted(set(inc_df['month']).union(exp_df['month']))
-    summary = []
-    for m in months:
-        summary.append({
-            'month': m,
-            'inc':   inc_df.loc[inc_df['month']==m, 'Gross'].sum(),
-            'exp':   exp_df.loc[exp_df['month']==m, 'amt'].sum(),
-            'tax':   inc_df.loc[inc_df['month']==m, 'taxes_due'].sum(),
-        })
-
-    inc_groups = defaultdict(list)
-    for rec in inc_df.to_dict('records'):
-        inc_groups[rec['month']].append(rec)
-    exp_groups = defaultdict(list)
-    for rec in exp_df.to_dict('records'):
-        exp_groups[rec['month']].append(rec)
-
-    yr_inc = inc_df.groupby('year')['Gross'].sum()
-    yr_exp = exp_df.groupby('year')['amt'].sum()
-    yr_tax = inc_df.groupby('year')['taxes_due'].sum()
-    years  = sorted(set(yr_inc.index).union(yr_exp.index).union(yr_tax.index))
-    yearly = [{
-        'year':      y,
-        'inc_total': float(yr_inc.get(y, 0)),
-        'exp_total': float(yr_exp.get(y, 0)),
-        'tax_total': float(yr_tax.get(y, 0)),
-    } for y in years]
-
-    return render_template_string(statements_html,
-        types=types,
-        filter_type=filter_type,
-        summary=summary,
-        inc_groups=inc_groups,
-        exp_groups=exp_groups,
-        yearly=yearly
-    )
-
-
-@app.route('/download-entry/<int:entry_id>')
-def download_entry(entry_id):
-    e = Entry.query.get_or_404(entry_id)
-
-    df_tax   = pd.read_csv(StringIO(e.tax_csv))
-    df_exp   = pd.read_csv(StringIO(e.exp_csv))
-    df_final = pd.read_csv(StringIO(e.final_csv))
-
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_final['FinalNet'].sum()
-
-    incs = Income.query.filter_by(entry_id=entry_id).all()
-
-    wb = Workbook()
-
-    ws1 = wb.active
-    ws1.title = 'Taxes'
-    for row in dataframe_to_rows(df_tax, index=False, header=True):
-        ws1.append(row)
-
-    ws2 = wb.create_sheet('Expenses & Net')
-    ws2.append(['Sender','Expense','Amount','Net After'])
-    for sender, name, amt, net_after in df_exp.values.tolist():
-        ws2.append([sender, name, amt, net_after])
-
-    ws3 = wb.create_sheet('Incomes')
-    ws3.append(['Date','Sender','Type','Gross','Taxes Due'])
-    for inc in incs:
-        if inc.income_type == '1099-NEC':
-            taxes_due = 0.0
-        else:
-            fed = calculate_federal_tax(inc.Gross)
-            st  = inc.Gross * louisiana_tax_rate
-            taxes_due = round(fed + st, 2)
-        ws3.append([
-            inc.date.strftime('%Y-%m-%d'),
-            inc.sender,
-            inc.income_type,
-            inc.Gross,
-            taxes_due
-        ])
-
-    ws4 = wb.create_sheet('Summary')
-    ws4.append(['Category','Value'])
-    ws4.append(['Total Tax',      total_tax])
-    ws4.append(['Total Expenses', total_exp])
-    ws4.append(['Final Net',      total_net])
-
-    labels = Reference(ws4, min_col=1, min_row=2, max_row=4)
-    data   = Reference(ws4, min_col=2, min_row=2, max_row=4)
-
-    pie1 = PieChart(); pie1.title='Tax Breakdown'
-    pie1.set_categories(labels); pie1.add_data(data, titles_from_data=False)
-    ws4.add_chart(pie1, 'E2')
-
-    pie2 = PieChart(); pie2.title='Overall Distribution'
-    pie2.set_categories(labels); pie2.add_data(data, titles_from_data=False)
-    ws4.add_chart(pie2, 'E20')
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-      out,
-      as_attachment=True,
-      download_name=f'report_{entry_id}.xlsx',
-      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-
-@app.route('/download-statements')
-def download_statements():
-    filter_type = request.args.get('type', 'All')
-
-    q = Income.query
-    if filter_type != 'All':
-        q = q.filter_by(income_type=filter_type)
-    incs = q.order_by(Income.date).all()
-
-    inc_df = pd.DataFrame([{
-        'date':         i.date,
-        'Gross':        i.Gross,
-        'income_type':  i.income_type,
-        'entry_id':     i.entry_id
-    } for i in incs])
-    if inc_df.empty:
-        inc_df = pd.DataFrame(columns=['date','Gross','income_type','entry_id'])
-    inc_df['date'] = pd.to_datetime(inc_df['date'])
-
-    exp_rows = []
-    for e in Entry.query.all():
-        try:
-            df = pd.read_csv(StringIO(e.exp_csv))
-            for _, r in df.iterrows():
-                exp_rows.append({
-                    'entry_id':   e.id,
-                    'entry_date': e.timestamp.date(),
-                    'sender':     r['Sender'],
-                    'name':       r['Name'],
-                    'amt':        r['Amount']
-                })
-        except:
-            pass
-    exp_df = pd.DataFrame(exp_rows)
-    if not exp_df.empty:
-        exp_df['entry_date'] = pd.to_datetime(exp_df['entry_date'])
-    else:
-        exp_df = pd.DataFrame(columns=['entry_id','entry_date','sender','name','amt'])
-
-    inc_df['month'] = inc_df['date'].dt.to_period('M').dt.to_timestamp()
-    inc_df['year']  = inc_df['date'].dt.year
-
-    exp_df['month'] = exp_df['entry_date'].dt.to_period('M').dt.to_timestamp()
-    exp_df['year']  = exp_df['entry_date'].dt.year
-
-    mon_inc = inc_df.groupby('month')['Gross'].sum().reset_index(name='inc_total')
-    mon_exp = exp_df.groupby('month')['amt'].sum().reset_index(name='exp_total')
-    mon_tax = inc_df.assign(
-        taxes = inc_df.apply(lambda r: 0.0 if r['income_type']=='1099-NEC'
-                             else calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, axis=1)
-      ).groupby('month')['taxes'].sum().reset_index(name='tax_total')
-
-    monthly = mon_inc.merge(mon_exp, on='month', how='outer')\
-                     .merge(mon_tax, on='month', how='outer')\
-                     .fillna(0)
-
-    yr_inc = inc_df.groupby('year')['Gross'].sum().reset_index(name='inc_total')
-    yr_exp = exp_df.groupby('year')['amt'].sum().reset_index(name='exp_total')
-    yr_tax = inc_df.assign(
-        taxes = inc_df.apply(lambda r: 0.0 if r['income_type']=='1099-NEC'
-                             else calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, axis=1)
-      ).groupby('year')['taxes'].sum().reset_index(name='tax_total')
-
-    yearly = yr_inc.merge(yr_exp, on='year', how='outer')\
-                   .merge(yr_tax, on='year', how='outer')\
-                   .fillna(0)
-
-    wb = Workbook()
-
-    ws1 = wb.active
-    ws1.title = 'Monthly Summary'
-    ws1.append(['Month','Total Income','Total Expenses','Total Taxes Due'])
-    for _, r in monthly.sort_values('month').iterrows():
-        ws1.append([r['month'].strftime('%Y-%m'), r['inc_total'], r['exp_total'], r['tax_total']])
-
-    ws2 = wb.create_sheet('Yearly Summary')
-    ws2.append(['Year','Total Income','Total Expenses','Total Taxes Due'])
-    for _, r in yearly.sort_values('year').iterrows():
-        ws2.append([int(r['year']), r['inc_total'], r['exp_total'], r['tax_total']])
-
-    ws3 = wb.create_sheet('All Incomes')
-    ws3.append(['Date','Sender','Type','Gross','Taxes Due','Entry ID'])
-    for _, r in inc_df.sort_values('date').iterrows():
-        taxes = 0.0 if r['income_type']=='1099-NEC' else round(
-            calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, 2)
-        ws3.append([r['date'].strftime('%Y-%m-%d'),
-                    '',  # if you want sender you can join via Income model 
-                    r['income_type'],
-                    r['Gross'],
-                    taxes,
-                    int(r['entry_id'])])
-
-    ws4 = wb.create_sheet('All Expenses')
-    ws4.append(['Entry Date','Sender','Expense','Amount','Entry ID'])
-    for _, r in exp_df.sort_values('entry_date').iterrows():
-        ws4.append([r['entry_date'].strftime('%Y-%m-%d'),
-                    r['sender'],
-                    r['name'],
-                    r['amt'],
-                    int(r['entry_id'])])
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-      out,
-      as_attachment=True,
-      download_name='statements.xlsx',
-      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-if __name__ == '__main__':
-   
-     app.run(debug=True)
-     
-
-
-@app.route('/expense-entry', methods=['POST'])
-def expense_entry():
-    tax_csv = request.form['tax_csv']
-    exp_csv = request.form.get('exp_csv', '')
-    df_tax = pd.read_csv(StringIO(tax_csv))
-    num_checks = len(df_tax)
-    senders = df_tax['Sender'].tolist()
-
-    saved = {}
-    counts = {i: 0 for i in range(num_checks)}
-    if exp_csv:
-        df_exp = pd.read_csv(StringIO(exp_csv))
-        for _, row in df_exp.iterrows():
-            sender = row['Sender']
-            if sender in senders:
-                i = senders.index(sender)
-            else:
-                continue
-            j = counts[i]
-            saved[f'exp_name_{i}_{j}'] = row['Expense']
-            saved[f'exp_amt_{i}_{j}']  = str(row['Amount'])
-            counts[i] += 1
-
-    for i in range(num_checks):
-        saved[f'count_{i}'] = counts[i] or 1
-
-    return render_template_string(
-        expense_entry_html,
-        tax_csv=tax_csv,
-        num_checks=num_checks,
-        senders=senders,
-        saved=saved
-    )
-
-
-
-
-@app.route('/show-final', methods=['POST'])
-def show_final():
-   
-    exp_data = {}
-    df_tax = pd.read_csv(StringIO(request.form['tax_csv']))
-    for i, sender in enumerate(df_tax['Sender']):
-        cnt = int(request.form.get(f'count_{i}', 0))
-        exp_data[f'count_{i}'] = cnt
-        for j in range(cnt):
-            exp_data[f'exp_name_{i}_{j}'] = request.form.get(f'exp_name_{i}_{j}', '')
-            exp_data[f'exp_amt_{i}_{j}']  = request.form.get(f'exp_amt_{i}_{j}', '')
-    session['exp_data'] = exp_data
-
-    tax_csv = request.form['tax_csv']
-
-    df_tax = pd.read_csv(StringIO(tax_csv))
-
-    comp_labels = ['Self-EE', 'Fed', 'State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
-    ]
-
-    exp_lines = []
-    total_exp  = 0.0
-
-    for i, sender in enumerate(df_tax['Sender']):
-        cnt = int(request.form.get(f'count_{i}', 0))
-        for j in range(cnt):
-            name    = request.form.get(f'exp_name_{i}_{j}', '').strip()
-            amt_str = request.form.get(f'exp_amt_{i}_{j}', '').strip()
-            if not name or not amt_str:
-                continue
-            amt = float(amt_str)
-            exp_lines.append((sender, name, amt))
-            total_exp += amt
-
-
-
-    total_tax = df_tax['Total Tax'].sum()
-    total_net = df_tax['Net'].sum() - total_exp
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-
-    exp_rows = []
-    for sender, name, amt in exp_lines:
-        total_sender_exp = sum(a for s,_,a in exp_lines if s == sender)
-        net_profit = round(orig_nets[sender] - total_sender_exp, 2)
-        exp_rows.append([sender, name, amt, net_profit])
-
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    tax_cols = df_tax.columns.tolist()[1:]
-
-    return render_template_string(
-        final_html,
-        tax_cols=tax_cols,
-        tax_rows=tax_rows,
-        exp_rows=exp_rows,
-        total_tax=round(total_tax,2),
-        total_exp=round(total_exp,2),
-        total_net=round(total_net,2),
-        comp_labels=comp_labels,
-        comp_data=comp_data,
-        tax_csv=tax_csv,
-        exp_csv=pd.DataFrame(exp_rows, columns=['Sender','Name','Amount','Net Profit']).to_csv(index=False),
-        final_csv=pd.DataFrame([[r[3]] for r in exp_rows], columns=['FinalNet']).to_csv(index=False),
-        orig_nets=orig_nets
-    )
-from io import StringIO
-
-@app.route('/save-entry', methods=['POST'])
-def save_entry():
-    title = request.form['title'].strip()
-    if not title:
-        flash("You must supply a name.")
-        return redirect(request.referrer or url_for('index'))
+@bp.route('/save-entry', methods=['POST'])
+def save_entry():
+    title = request.form['title'].strip()
+    if not title:
+        flash("You must supply a name.")
+        return redirect(request.referrer or url_for('main.index'))
 
+    draft = load_draft()
+    tax_csv, exp_csv, final_csv = draft_csvs(draft)
     entry = Entry(
         title     = title,
-        tax_csv   = request.form['tax_csv'],
-        exp_csv   = request.form['exp_csv'],
-        final_csv = request.form['final_csv']
+        tax_csv   = tax_csv,
+        exp_csv   = exp_csv,
+        final_csv = final_csv
     )
     db.session.add(entry)
     db.session.flush()   # give us entry.id without committing
 
-    df_tax = pd.read_csv(StringIO(request.form['tax_csv']), parse_dates=['Date'])
-    for _, row in df_tax.iterrows():
-        db.session.add( Income(
+    incomes = []
+    for check in draft.checks:
+        incomes.append( Income(
             entry_id    = entry.id,
-            sender      = row['Sender'],
-            Gross       = float(row['Gross']),
-            income_type = row['Type'],
-            date        = row['Date'].date()     # or row['Date'] if it’s already a date
+            sender      = check['sender'],
+            gross_cents = check['gross'],
+            income_type = check['type'],
+            date        = date.fromisoformat(check['date']) if check['date'] else date.today()
         ) )
+    later_deltas = insert_ytd(incomes)
+    apply_taxes(incomes)
+    db.session.add_all(incomes)
+
+    date_map = {inc.sender: inc.date for inc in incomes}
+    entry.expenses = [
+        Expense(
+            sender       = ex['sender'],
+            name         = ex['name'],
+            amount_cents = ex['amount'],
+            date         = date_map.get(ex['sender'], entry.timestamp.date())
+        )
+        for ex in draft.expenses
+    ]
 
+    rollup_entry(incomes, entry.expenses)
+    apply_rollup_deltas(later_deltas)
+    bump_data_version()
     db.session.commit()
     flash(f'Entry "{title}" saved.')
-    return redirect(url_for('saved_entries'))
+    return redirect(url_for('main.saved_entries'))
 
 
 
-@app.route('/delete-entry/<int:entry_id>', methods=['POST'])
+@bp.route('/delete-entry/<int:entry_id>', methods=['POST'])
 def delete_entry(entry_id):
-    Income.query.filter_by(entry_id=entry_id).delete()
     entry = Entry.query.get_or_404(entry_id)
+    incomes = Income.query.filter_by(entry_id=entry_id).order_by(Income.id).all()
+    rollup_entry(incomes, Expense.query.filter_by(entry_id=entry_id).all(), sign=-1)
+    apply_rollup_deltas(remove_ytd(incomes))
+    bump_data_version()
+    Income.query.filter_by(entry_id=entry_id).delete()
+    Expense.query.filter_by(entry_id=entry_id).delete()
     db.session.delete(entry)
     db.session.commit()
     flash(f"Deleted entry {entry.timestamp:%Y-%m-%d %H:%M:%S}")
-    return redirect(url_for('saved_entries'))
+    return redirect(url_for('main.saved_entries'))
 
-@app.route('/saved-entries')
+def entry_cursor(entry):
+    return f"{entry.timestamp.isoformat()}_{entry.id}"
+
+@bp.route('/saved-entries')
 def saved_entries():
-    entries = Entry.query.order_by(Entry.timestamp.desc()).all()
-    return render_template_string(
-        base_style + nav_html + '''
-<h2>Saved Entries</h2>
-<ul>
-  {% for e in entries %}
-    <li>
-      <strong>{{ e.title }}</strong>
-      &nbsp;(<small>{{ e.timestamp.strftime('%Y-%m-%d') }}</small>)
-      [<a href="{{ url_for('view_entry', entry_id=e.id) }}">View/Edit</a>]
-      [<a href="{{ url_for('download_entry', entry_id=e.id) }}">Download</a>]
-      <form action="{{ url_for('delete_entry', entry_id=e.id) }}"
-            method="post" style="display:inline;margin-left:8px;">
-        <button type="submit">Delete</button>
-      </form>
-    </li>
-  {% endfor %}
-</ul>
-''', entries=entries
+    """
+    Newest first, a page at a time. Pages are keyed on (timestamp, id) of the
+    last entry shown rather than an offset, so every page is one index range
+    scan, and only the listed columns are read (never the CSV blobs).
+    """
+    per_page = current_app.config['ENTRIES_PER_PAGE']
+    q = Entry.query.options(db.load_only(Entry.id, Entry.title, Entry.timestamp))
+
+    before = request.args.get('before')
+    if before:
+        try:
+            ts, entry_id = before.rsplit('_', 1)
+            key = (datetime.fromisoformat(ts), int(entry_id))
+        except ValueError:
+            abort(400)
+        q = q.filter(db.tuple_(Entry.timestamp, Entry.id) < key)
+
+    entries = q.order_by(Entry.timestamp.desc(), Entry.id.desc()).limit(per_page + 1).all()
+    next_cursor = entry_cursor(entries[per_page - 1]) if len(entries) > per_page else None
+    return render_template('saved_entries.html',
+        entries=entries[:per_page],
+        next_cursor=next_cursor,
+        first_page=not before
     )
 
 
-@app.route('/view-entry/<int:entry_id>', methods=['GET'])
+@bp.route('/view-entry/<int:entry_id>', methods=['GET'])
 def view_entry(entry_id):
-    entry = Entry.query.get_or_404(entry_id)
-
-    df_tax = pd.read_csv(StringIO(entry.tax_csv))
-    try:
-        df_exp = pd.read_csv(StringIO(entry.exp_csv))
-    except pd.errors.EmptyDataError:
-        df_exp = pd.DataFrame(columns=['Sender','Name','Amount','Net Profit'])
-
-    comp_labels = ['Self-EE','Fed','State']
-    comp_data = [
-        df_tax['Self-EE Tax'].sum(),
-        df_tax['Fed Tax'].sum(),
-        df_tax['State Tax'].sum()
-    ]
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_exp['Net Profit'].sum()
-    orig_nets = df_tax.set_index('Sender')['Net'].to_dict()
-
-    tax_cols = df_tax.columns.tolist()[1:]
-    tax_rows = [row[1:] for row in df_tax.values.tolist()]
-    exp_rows = df_exp[['Sender','Name','Amount','Net Profit']].values.tolist()
-
-    incomes = entry.incomes  # thanks to the backref
-    ctx = {
-        'tax_cols': tax_cols,
-        'tax_rows': tax_rows,
-        'exp_rows': exp_rows,
-        'comp_labels': comp_labels,
-        'comp_data': comp_data,
-        'total_tax': round(total_tax,2),
-        'total_exp': round(total_exp,2),
-        'total_net': round(total_net,2),
-        'tax_csv': entry.tax_csv,
-        'exp_csv': entry.exp_csv,
-        'final_csv': entry.final_csv,
-        'orig_nets': orig_nets,
-        'view_only': True,
-    }
-    return render_template_string(final_html, **ctx)
+    Entry.query.get_or_404(entry_id)
+    # a GET writes nothing: saving or exporting from the page posts entry_id
+    return render_template('final.html', **final_context(stored_draft(entry_id), view_only=True,
+                                                         entry_id=entry_id))
 
-@app.route('/download-final', methods=['POST'])
-def download_final():
-    df_tax   = pd.read_csv(StringIO(request.form['tax_csv']))
-    df_exp   = pd.read_csv(StringIO(request.form['exp_csv']))
-    df_final = pd.read_csv(StringIO(request.form['final_csv']))
+def write_final_workbook(fileobj, draft):
+    """The wizard's report: taxes, expenses and a summary with pie charts."""
+    from openpyxl import Workbook
+    from openpyxl.chart import PieChart, Reference
 
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_final['FinalNet'].sum()
+    total_tax, total_exp, total_net = final_totals(draft)
 
     wb = Workbook()
 
+    # cells hold dollars as numbers so the sheet can do its own sums
     ws1 = wb.active
     ws1.title = 'Taxes'
-    for row in dataframe_to_rows(df_tax, index=False, header=True):
-        ws1.append(row)
+    ws1.append(TAX_COLUMNS)
+    for check in draft.checks:
+        ws1.append([check[k] / 100 if k in MONEY_KEYS else check[k] for k in CHECK_KEYS])
 
     ws2 = wb.create_sheet('Expenses & Net')
     ws2.append(['Sender', 'Expense', 'Amount', 'Net After'])
-    for sender, name, amt, net_after in df_exp.values.tolist():
-        ws2.append([sender, name, amt, net_after])
+    for sender, name, amt, net_after in draft_expense_rows(draft):
+        ws2.append([sender, name, amt / 100, net_after / 100])
 
     ws3 = wb.create_sheet('Summary')
     ws3.append(['Category', 'Value'])
-    ws3.append(['Total Tax', total_tax])
-    ws3.append(['Total Expenses', total_exp])
-    ws3.append(['Final Net', total_net])
+    ws3.append(['Total Tax', total_tax / 100])
+    ws3.append(['Total Expenses', total_exp / 100])
+    ws3.append(['Final Net', total_net / 100])
 
     pie1 = PieChart()
     pie1.title = "Tax Breakdown"
@@ -2242,176 +1863,662 @@ def download_final():
     pie2.set_categories(labels)
     ws3.add_chart(pie2, "E20")
 
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-        out,
-        as_attachment=True,
-        download_name='report.xlsx',
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    wb.save(fileobj)
 
-from collections import defaultdict
-from datetime import datetime
+@bp.route('/download-final', methods=['POST'])
+def download_final():
+    draft = load_draft()
+    key   = report_key('final', *draft_csvs(draft))
+    path  = cached_report(key, lambda out: write_final_workbook(out, draft))
+    return send_report(path, key, 'report.xlsx')
+
+def month_bounds(month):
+    """'2024-03' -> (date(2024, 3, 1), date(2024, 4, 1))"""
+    start = datetime.strptime(month, '%Y-%m').date()
+    if start.month == 12:
+        return start, date(start.year + 1, 1, 1)
+    return start, date(start.year, start.month + 1, 1)
+
+def rollup_summary(filter_type):
+    """
+    Monthly and yearly totals in cents straight from MonthlyRollup. Income
+    and taxes honour `filter_type`; expenses are always totalled across
+    every type. Integer sums, so the months always add up to the year.
+    """
+    if filter_type != 'All':
+        picked = MonthlyRollup.income_type == filter_type
+    else:
+        picked = db.true()
+
+    def pick(col):
+        return db.func.sum(db.case((picked, col), else_=0))
+
+    rows = db.session.query(
+        MonthlyRollup.year,
+        MonthlyRollup.month,
+        pick(MonthlyRollup.inc_cents),
+        db.func.sum(MonthlyRollup.exp_cents),
+        pick(MonthlyRollup.tax_cents),
+        pick(MonthlyRollup.count)
+    ).group_by(MonthlyRollup.year, MonthlyRollup.month)\
+     .order_by(MonthlyRollup.year, MonthlyRollup.month)
+
+    monthly = []
+    yearly  = {}
+    for y, m, inc, exp, tax, n in rows:
+        if not n and not exp:
+            continue
+        monthly.append({'month': f'{y:04d}-{m:02d}', 'inc': inc, 'exp': exp, 'tax': tax})
+        yr = yearly.setdefault(y, {'year': y, 'inc': 0, 'exp': 0, 'tax': 0})
+        yr['inc'] += inc
+        yr['exp'] += exp
+        yr['tax'] += tax
+    return monthly, list(yearly.values())
+
+def statements_context(filter_type, data_version):
+    """
+    Everything the statements page shows. create_app() wraps this in an LRU
+    cache; `data_version` is only part of the key, so a save or delete
+    moves later views onto a fresh entry.
+    """
+    all_types = [r[0] for r in Income.query.with_entities(Income.income_type).distinct()]
+    summary, yearly = rollup_summary(filter_type)
+    return {
+        'types':       ['All'] + all_types,
+        'filter_type': filter_type,
+        'summary':     summary,
+        'yearly':      yearly,
+    }
 
-@app.route('/statements')
+@bp.route('/statements')
 def statements():
-    all_types   = [r[0] for r in Income.query.with_entities(Income.income_type).distinct()]
-    types       = ['All'] + all_types
     filter_type = request.args.get('type', 'All')
+    context = current_app.extensions['statements_cache'](filter_type, current_data_version())
+    return render_template('statements.html', **context)
+
+@bp.route('/statements/<month>')
+def statement_month(month):
+    """Detail rows for a single month, fetched when the user expands it."""
+    filter_type = request.args.get('type', 'All')
+    try:
+        start, end = month_bounds(month)
+    except ValueError:
+        abort(404)
 
-    q = Income.query
+    q = Income.query.filter(Income.date >= start, Income.date < end)
     if filter_type != 'All':
         q = q.filter(Income.income_type == filter_type)
-    inc_objs = q.all()
-
-    inc_rows = []
-    for inc in inc_objs:
-        if inc.income_type == '1099-NEC':
-            se   = inc.Gross * 0.153
-            fed  = calculate_federal_tax(inc.Gross)
-            st   = inc.Gross * louisiana_tax_rate
-            tax_amt = round(se + fed + st, 2)
-        else:
-            tax_amt = 0.0
-
-        inc_rows.append({
-            'entry_id':  inc.entry_id,
-            'date':      inc.date,
-            'sender':    inc.sender,
-            'type':      inc.income_type,
-            'Gross':     inc.Gross,
-            'taxes_due': tax_amt
-        })
-
-    inc_df = pd.DataFrame(inc_rows)
-    for col, dtype in (('date','datetime64[ns]'),
-                       ('Gross','float64'),
-                       ('taxes_due','float64')):
-        if col not in inc_df:
-            inc_df[col] = pd.Series(dtype=dtype)
+    inc_objs = q.order_by(Income.date).all()
+
+    incomes = [{
+        'entry_id':    inc.entry_id,
+        'date':        inc.date,
+        'sender':      inc.sender,
+        'type':        inc.income_type,
+        'gross_cents': inc.gross_cents,
+        'tax_cents':   inc.tax_cents
+    } for inc in inc_objs]
+
+    expenses = Expense.query.filter(Expense.date >= start, Expense.date < end)\
+                            .order_by(Expense.date).all()
+
+    return render_template('statement_month.html',
+        incomes=incomes,
+        expenses=expenses
+    )
 
-    inc_df['date']  = pd.to_datetime(inc_df['date'])
-    inc_df['month'] = inc_df['date'].dt.to_period('M').dt.to_timestamp()
-    inc_df['year']  = inc_df['date'].dt.year
 
-    exp_rows = []
-    for entry in Entry.query.all():
-        if not entry.exp_csv.strip():
-            continue
-        df_exp = pd.read_csv(StringIO(entry.exp_csv))
-        date_map = {i.sender: i.date for i in entry.incomes}
-        for _, r in df_exp.iterrows():
-            d = date_map.get(r['Sender'], entry.timestamp.date())
-            exp_rows.append({
-                'entry_id': entry.id,
-                'date':      d,
-                'sender':    r['Sender'],
-                'name':      r['Name'],
-                'amt':       r['Amount']
-            })
-
-    exp_df = pd.DataFrame(exp_rows)
-    if not exp_df.empty:
-        exp_df['date']  = pd.to_datetime(exp_df['date'])
-        exp_df['month'] = exp_df['date'].dt.to_period('M').dt.to_timestamp()
-        exp_df['year']  = exp_df['date'].dt.year
-    else:
-        for col in ('date','month','year','amt'):
-            exp_df[col] = pd.Series(dtype='datetime64[ns]' if col!='amt' else 'float64')
-
-    months  = sorted(set(inc_df['month']).union(exp_df['month']))
-    summary = []
-    for m in months:
-        summary.append({
-            'month': m,
-            'inc':   inc_df.loc[inc_df['month']==m, 'Gross'].sum(),
-            'exp':   exp_df.loc[exp_df['month']==m, 'amt'].sum(),
-            'tax':   inc_df.loc[inc_df['month']==m, 'taxes_due'].sum(),
-        })
+# ---- batch API -------------------------------------------------------------
+# POST /api/v1/calculate takes a JSON array of checks, or a CSV upload in the
+# `file` field with the same columns as a header row:
+#     [{"sender": "Acme", "gross": 1250.00, "type": "1099-NEC", "date": "2024-03-01"}, ...]
+# `type` defaults to 1099-NEC and `date` is optional. The whole batch goes
+# through the engine in one call and the breakdown is streamed back as
+#     {"checks": [{sender, type, date, gross, se, fed, state, total, net}, ...],
+#      "totals": {gross, se, fed, state, total, net}}
 
-    inc_groups = defaultdict(list)
-    for rec in inc_df.to_dict('records'):
-        inc_groups[rec['month']].append(rec)
-    exp_groups = defaultdict(list)
-    for rec in exp_df.to_dict('records'):
-        exp_groups[rec['month']].append(rec)
-
-    yr_inc = inc_df.groupby('year')['Gross'].sum()
-    yr_exp = exp_df.groupby('year')['amt'].sum()
-    yr_tax = inc_df.groupby('year')['taxes_due'].sum()
-    years  = sorted(set(yr_inc.index).union(yr_exp.index).union(yr_tax.index))
-    yearly = [{
-        'year':      y,
-        'inc_total': float(yr_inc.get(y, 0)),
-        'exp_total': float(yr_exp.get(y, 0)),
-        'tax_total': float(yr_tax.get(y, 0)),
-    } for y in years]
-
-    return render_template_string(statements_html,
-        types=types,
-        filter_type=filter_type,
-        summary=summary,
-        inc_groups=inc_groups,
-        exp_groups=exp_groups,
-        yearly=yearly
-    )
+API_CHUNK = 1000   # checks serialised per streamed chunk
 
+class BadBatch(ValueError):
+    pass
 
+# to_cents() refuses anything past MAX_CENTS, where the tax math would overflow
+BAD_AMOUNT = f'of at most {dollars(MAX_CENTS)} in size'
 
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.chart import PieChart, Reference
+def csv_text_lines(stream):
+    """The lines of a CSV byte stream as text; BadBatch at the first that is not UTF-8."""
+    for line_no, line in enumerate(stream, 1):
+        try:
+            yield line.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise BadBatch(f'line {line_no}: not UTF-8 text')
+
+def csv_dict_rows(stream):
+    """Rows of a CSV byte stream as dicts keyed by stripped, lower-cased header names."""
+    for row in csv.DictReader(csv_text_lines(stream)):
+        yield {k.strip().lower(): v for k, v in row.items() if k}
+
+def parse_batch_checks():
+    """(senders, types, dates, grosses) from the request, or BadBatch."""
+    limit  = current_app.config['API_MAX_CHECKS']
+    upload = request.files.get('file')
+    if upload:
+        # one row past the limit is enough to refuse the upload
+        rows = list(islice(csv_dict_rows(upload.stream), limit + 1))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            raise BadBatch('expected a JSON array of checks or a CSV upload in "file"')
+    if len(rows) > limit:
+        raise BadBatch(f'at most {limit} checks per request')
+
+    senders, types, dates, grosses = [], [], [], []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise BadBatch(f'check {i}: expected an object')
+        try:
+            grosses.append(to_cents(row['gross']))
+        except (KeyError, ValueError):
+            raise BadBatch(f'check {i}: "gross" must be a number {BAD_AMOUNT}')
+        date_str = row.get('date') or None
+        if date_str:
+            # normalised, as the import does: the dates are echoed back and
+            # sorted as text, and their year is read off the first four digits
+            try:
+                date_str = date.fromisoformat(date_str).isoformat()
+            except (TypeError, ValueError):
+                raise BadBatch(f'check {i}: "date" must be YYYY-MM-DD')
+        inc_type = row.get('type') or '1099-NEC'
+        if not isinstance(inc_type, str):
+            raise BadBatch(f'check {i}: "type" must be a string')
+        senders.append(str(row.get('sender') or ''))
+        types.append(inc_type)
+        dates.append(date_str)
+    return senders, types, dates, grosses
+
+@bp.route('/api/v1/calculate', methods=['POST'])
+def api_calculate():
+    try:
+        senders, types, dates, grosses = parse_batch_checks()
+    except BadBatch as exc:
+        return {'error': str(exc)}, 400
+
+    # a stateless calculator: the year-to-date totals run across this
+    # batch's own checks per year, undated ones forming a year of their own
+    years = [int(d[:4]) if d else None for d in dates]
+    wages, taxable = running_ytd([(y or 0, d or '') for y, d in zip(years, dates)], types, grosses)
+    taxes = compute_taxes(grosses, types, wages, taxable,
+                          [y or schedule_for().year for y in years])
+    # cents inside, dollar numbers in the JSON; totals are summed in cents
+    money  = dict(gross=grosses, **{k: taxes[k].tolist() for k in ('se', 'fed', 'state', 'total', 'net')})
+    totals = {k: sum(v) / 100 for k, v in money.items()}
+
+    def generate():
+        yield '{"checks":['
+        for start in range(0, len(grosses), API_CHUNK):
+            yield (',' if start else '') + ','.join(
+                json.dumps({
+                    'sender': senders[i],
+                    'type':   types[i],
+                    'date':   dates[i],
+                    'gross':  money['gross'][i] / 100,
+                    'se':     money['se'][i] / 100,
+                    'fed':    money['fed'][i] / 100,
+                    'state':  money['state'][i] / 100,
+                    'total':  money['total'][i] / 100,
+                    'net':    money['net'][i] / 100,
+                })
+                for i in range(start, min(start + API_CHUNK, len(grosses)))
+            )
+        yield '],"totals":' + json.dumps(totals) + '}'
+
+    return Response(generate(), mimetype='application/json')
+
+# ---- CSV import --------------------------------------------------------------
+# Historical incomes arrive as CSV with a header row of sender, gross, type,
+# date and, optionally, expenses written as "name=amount;name=amount". The
+# file is read as a stream, validated row by row and written
+# IMPORT_BATCH_ROWS at a time with executemany, so memory stays flat however
+# long it is. The rows are filed as entries of at most IMPORT_ENTRY_CHECKS
+# checks, so each one can still be viewed, edited and exported like a
+# saved one, all in one transaction: a bad row anywhere rolls the whole
+# import back.
+
+IMPORT_BATCH_ROWS = 5000
+# taxes are left to recompute_ytd(), which writes every new row's running totals anyway
+IMPORT_INCOME_COLUMNS  = ('entry_id', 'sender', 'Gross', 'income_type', 'date')
+IMPORT_EXPENSE_COLUMNS = ('entry_id', 'sender', 'name', 'amount', 'date')
+
+def import_insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+def import_batches(stream):
+    """
+    Yield the CSV's rows IMPORT_BATCH_ROWS at a time as validated columns,
+    (senders, grosses, types, dates, expenses), raising BadBatch with the
+    line number of the first row that does not parse. Dates stay ISO
+    strings, which is how the Date columns are stored.
+    """
+    reader = csv.reader(csv_text_lines(stream))
+    header = [h.strip().lower() for h in next(reader, [])]
+    missing = {'gross', 'date'} - set(header)
+    if missing:
+        raise BadBatch(f"missing column(s): {', '.join(sorted(missing))}")
+    pos = {name: header.index(name) if name in header else None
+           for name in ('sender', 'gross', 'type', 'date', 'expenses')}
+
+    first_line = 2
+    while True:
+        chunk = list(islice(reader, IMPORT_BATCH_ROWS))
+        if not chunk:
+            return
+        lines = [first_line + k for k, row in enumerate(chunk) if row]
+        rows  = [row for row in chunk if row]
+        first_line += len(chunk)
+
+        def column(name, default=''):
+            k = pos[name]
+            if k is None:
+                return [default] * len(rows)
+            return [row[k].strip() if k < len(row) else default for row in rows]
+
+        def convert(values, parse, message):
+            try:
+                return [parse(v) for v in values]
+            except ValueError:
+                for line_no, v in zip(lines, values):
+                    try:
+                        parse(v)
+                    except ValueError:
+                        raise BadBatch(f'line {line_no}: {message}')
+
+        yield (
+            column('sender'),
+            convert(column('gross'), to_cents, f'"gross" must be a number {BAD_AMOUNT}'),
+            [t or '1099-NEC' for t in column('type')],
+            convert(column('date'), lambda v: date.fromisoformat(v).isoformat(),
+                    '"date" must be YYYY-MM-DD'),
+            convert(column('expenses'), parse_import_expenses,
+                    'expenses must look like "name=amount;name=amount"'),
+        )
+
+def parse_import_expenses(text):
+    if not text:
+        return []
+    expenses = []
+    for part in filter(None, (p.strip() for p in text.split(';'))):
+        name, sep, amount = part.rpartition('=')
+        if not sep or not name.strip():
+            raise ValueError(part)
+        expenses.append((name.strip(), to_cents(amount)))
+    return expenses
+
+def import_incomes(stream, title):
+    """
+    Import a CSV byte stream as new entries of at most IMPORT_ENTRY_CHECKS
+    checks each; returns (entry_ids, incomes, expenses).
+    """
+    per_entry   = current_app.config['IMPORT_ENTRY_CHECKS']
+    income_sql  = import_insert_sql('income',  IMPORT_INCOME_COLUMNS)
+    expense_sql = import_insert_sql('expense', IMPORT_EXPENSE_COLUMNS)
+    try:
+        conn    = db.session.connection()
+        deltas  = rollup_deltas()
+        years   = set()
+        entries = []
+        n_incomes = n_expenses = 0
+
+        for senders, grosses, types, dates, expense_lists in import_batches(stream):
+            # plain tuples straight to the driver's executemany: building ORM
+            # objects or bound-parameter dicts would cost more than SQLite does
+            incomes, expenses = [], []
+            for sender, gross, inc_type, d, exps in zip(senders, grosses, types, dates, expense_lists):
+                if n_incomes % per_entry == 0:
+                    # the CSV copies stay empty: the rows are all in Income/Expense
+                    entries.append(Entry(title=title, tax_csv=','.join(TAX_COLUMNS) + '\n',
+                                         exp_csv='Sender,Name,Amount,Net Profit\n',
+                                         final_csv='FinalNet\n'))
+                    db.session.add(entries[-1])
+                    db.session.flush()
+                    entry_id = entries[-1].id
+                    # expenses count under their sender's first check, as in rollup_entry()
+                    first_type = {}
+                n_incomes += 1
+                year, month = int(d[:4]), int(d[5:7])
+                incomes.append((entry_id, sender, gross, inc_type, d))
+                bucket = deltas[(year, month, inc_type)]
+                bucket['inc_cents'] += gross
+                bucket['count']     += 1
+                exp_type = first_type.setdefault(sender, inc_type)
+                if exps:
+                    bucket = deltas[(year, month, exp_type)]
+                    bucket['count'] += len(exps)
+                    for name, amount in exps:
+                        expenses.append((entry_id, sender, name, amount, d))
+                        bucket['exp_cents'] += amount
+                years.add(year)
+            conn.exec_driver_sql(income_sql, incomes)
+            if expenses:
+                conn.exec_driver_sql(expense_sql, expenses)
+            n_expenses += len(expenses)
+        if not n_incomes:
+            raise BadBatch('no rows to import')
+        if len(entries) > 1:
+            for k, entry in enumerate(entries, 1):
+                entry.title = f'{title} ({k} of {len(entries)})'
+
+        # rows arrive in any order, so the wage base is settled afterwards,
+        # one pass per year touched, instead of shifting row by row; that
+        # pass also taxes the new rows, and adds their taxes to `deltas`
+        recompute_ytd(sorted(years), deltas)
+        apply_rollup_deltas(deltas)
+        bump_data_version()
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    return [entry.id for entry in entries], n_incomes, n_expenses
+
+@bp.route('/api/v1/import', methods=['POST'])
+def api_import():
+    upload = request.files.get('file')
+    if not upload:
+        return {'error': 'upload the CSV in the "file" field'}, 400
+    title   = request.form.get('title') or f'Import of {upload.filename or "CSV"}'
+    started = time.perf_counter()
+    try:
+        entry_ids, n_inc, n_exp = import_incomes(upload.stream, title)
+    except BadBatch as exc:
+        return {'error': str(exc)}, 400
+    return {
+        'entry_ids': entry_ids,
+        'incomes':   n_inc,
+        'expenses':  n_exp,
+        'seconds':   round(time.perf_counter() - started, 3),
+        'view_urls': [url_for('main.view_entry', entry_id=entry_id) for entry_id in entry_ids],
+    }, 201
+
+@bp.cli.command('import-incomes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--title', help='name of the Entry the rows are filed under')
+def import_incomes_command(path, title):
+    """Import a CSV of sender,gross,type,date[,expenses] rows as saved entries."""
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        try:
+            entry_ids, n_inc, n_exp = import_incomes(f, title or f'Import of {os.path.basename(path)}')
+        except BadBatch as exc:
+            raise click.ClickException(str(exc))
+    elapsed = time.perf_counter() - started
+    print(f'{len(entry_ids)} entries ({entry_ids[0]}-{entry_ids[-1]}): {n_inc} incomes, '
+          f'{n_exp} expenses in {elapsed:.1f}s ({n_inc / elapsed:,.0f} rows/s)')
+
+# ---- what-if scenarios -----------------------------------------------------
+# /scenarios re-prices a saved entry, or every check of a year, under a grid
+# of changes: gross multipliers x tax schedules x state rates, every
+# combination one scenario. Each check keeps its stored year-to-date totals,
+# so an entry is priced where it sits in its year, a multiplier scaling the
+# whole year's income, and the baseline is the taxes as stored.
+# POST /api/v1/scenarios takes the same grid as JSON,
+#     {"entry_id": 12, "multipliers": "0.5:1.5:0.01", "state_rates": [0.03, 0.0425],
+#      "schedules": [2024, {"label": "flat", "brackets": [...], "ss_wage_base": 170000}]}
+# ("year" instead of "entry_id"), a schedule being a tax year or a bracket
+# table in whole dollars, and answers with the page's table and chart data.
+
+SCENARIO_MONEY = ('gross', 'se', 'fed', 'state', 'total', 'net', 'net_change')
+
+def parse_multiplier(value):
+    m = float(value)
+    if not 0 <= m < float('inf'):
+        raise ValueError(value)
+    return m
+
+def parse_state_rate(value):
+    r = float(value)
+    if not 0 <= r < 1:
+        raise ValueError(value)
+    return r
+
+def parse_schedule(value):
+    """A tax year's TaxSchedule, or a custom one from a bracket table object."""
+    if not isinstance(value, dict):
+        return schedule_for(int(float(value)))
+    current  = schedule_for()
+    brackets = tuple(round(float(b)) for b in value['brackets'])
+    if len(brackets) != len(FEDERAL_RATES) - 1 or brackets[0] <= 0 or list(brackets) != sorted(brackets):
+        raise ValueError(value)
+    ss_wage_base = round(float(value.get('ss_wage_base', current.ss_wage_base / 100)))
+    # whole dollars, held as cents: past MAX_CENTS the bracket table's sums overflow
+    if max(brackets[-1], ss_wage_base) * 100 > MAX_CENTS:
+        raise ValueError(value)
+    return TaxSchedule(None, str(value.get('label') or 'custom'), brackets, ss_wage_base,
+                       parse_state_rate(value.get('state_rate', current.state_rate / RATE_SCALE)))
+
+def parse_axis(value, parse, name):
+    """
+    A grid axis from a JSON list or comma separated text, where an item may
+    be a start:stop:step range (stop included); [None] when not given.
+    """
+    if value is None or value == '' or value == []:
+        return [None]
+    items = value.split(',') if isinstance(value, str) else value
+    if not isinstance(items, list):
+        raise BadBatch(f'"{name}" must be a list or comma separated text')
+    limit = current_app.config['SCENARIOS_MAX']
+    axis  = []
+    for item in items:
+        try:
+            if isinstance(item, str) and item.count(':') == 2:
+                start, stop, step = map(float, item.split(':'))
+                if not step > 0 or not 0 <= (stop - start) / step < limit:
+                    raise ValueError(item)
+                count = int((stop - start) / step + 1e-9) + 1
+                axis += [parse(round(start + k * step, 10)) for k in range(count)]
+            else:
+                axis.append(parse(item.strip() if isinstance(item, str) else item))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise BadBatch(f'"{name}": cannot use {item!r}')
+    return axis
+
+def scenario_checks(entry_id=None, year=None):
+    """An entry's or a year's checks, with their stored YTD totals and taxes, in (date, id) order."""
+    q = db.session.query(Income.gross_cents, Income.income_type, Income.date,
+                         Income.ytd_wages_cents, Income.ytd_taxable_cents,
+                         Income.se_cents, Income.fed_cents, Income.state_cents)
+    q = q.filter(Income.entry_id == entry_id) if entry_id is not None else q.filter(in_year(year))
+    return q.order_by(Income.date, Income.id).all()
+
+def run_scenarios(params):
+    """
+    The comparison for `params` (a JSON object or the query args), money in
+    cents: the checks' taxes as stored, one row per scenario in
+    grid order and the net of every (schedule, state rate) pair across the
+    multipliers for the chart. BadBatch if the request does not add up.
+    """
+    entry_id, year = params.get('entry_id') or None, params.get('year') or None
+    if (entry_id is None) == (year is None):
+        raise BadBatch('give either "entry_id" or "year"')
+    try:
+        source = {'entry_id': int(entry_id)} if entry_id is not None else {'year': int(year)}
+    except (TypeError, ValueError):
+        raise BadBatch('"entry_id" and "year" must be whole numbers')
+
+    multipliers = [1.0 if m is None else m
+                   for m in parse_axis(params.get('multipliers'), parse_multiplier, 'multipliers')]
+    schedules   = parse_axis(params.get('schedules'), parse_schedule, 'schedules')
+    state_rates = parse_axis(params.get('state_rates'), parse_state_rate, 'state_rates')
+    if len(multipliers) * len(schedules) * len(state_rates) > current_app.config['SCENARIOS_MAX']:
+        raise BadBatch(f"at most {current_app.config['SCENARIOS_MAX']} scenarios per request")
+
+    checks = scenario_checks(**source)
+    if not checks:
+        raise BadBatch('no checks to simulate')
+    gross, types, dates, wages, taxable, se, fed, state = (list(col) for col in zip(*checks))
+    years = [d.year for d in dates]
+    # the grid works in int64 cents like compute_taxes(), so the largest
+    # amount a scenario prices, a year's running total, has the same bound
+    largest = max(max(w, t) + g for w, t, g in zip(wages, taxable, gross))
+    if max(multipliers) * largest > MAX_CENTS:
+        raise BadBatch(f'"multipliers": at most {MAX_CENTS / largest:g} for these checks')
+
+    grid     = scenario_grid(gross, types, years, wages, multipliers, schedules, state_rates,
+                             ytd_taxable=taxable)
+    baseline = {'gross': sum(gross), 'se': sum(se), 'fed': sum(fed), 'state': sum(state)}
+    baseline['total'] = baseline['se'] + baseline['fed'] + baseline['state']
+    baseline['net']   = baseline['gross'] - baseline['total']
+    columns  = {k: v.astype('int64').ravel().tolist() for k, v in grid.items()}
+    labels   = [sched.version if sched else 'own year' for sched in schedules]
+
+    rows = []
+    for i, (m, label, rate) in enumerate(product(multipliers, labels, state_rates)):
+        row = {'multiplier': m, 'schedule': label, 'state_rate': rate}
+        row.update((k, v[i]) for k, v in columns.items())
+        row['net_change'] = row['net'] - baseline['net']
+        rows.append(row)
+    series = [
+        {'label': f"{label}, state {'schedule' if rate is None else rate}",
+         'net':   grid['net'][:, b, r].astype('int64').tolist()}
+        for b, label in enumerate(labels) for r, rate in enumerate(state_rates)
+    ]
+    return {
+        'source':    source,
+        'checks':    len(checks),
+        'baseline':  baseline,
+        'scenarios': rows,
+        'chart':     {'multipliers': multipliers, 'series': series},
+    }
 
-@app.route('/download-entry/<int:entry_id>')
-def download_entry(entry_id):
-    e = Entry.query.get_or_404(entry_id)
+@bp.route('/scenarios')
+def scenarios():
+    years  = [y for (y,) in db.session.query(MonthlyRollup.year).distinct().order_by(MonthlyRollup.year)]
+    result = error = None
+    status = 200
+    if request.args.get('entry_id') or request.args.get('year'):
+        try:
+            result = run_scenarios(request.args)
+        except BadBatch as exc:
+            error, status = str(exc), 400
+    return render_template('scenarios.html', args=request.args, years=years, result=result, error=error,
+                           table_rows=current_app.config['SCENARIOS_TABLE_ROWS']), status
+
+@bp.route('/api/v1/scenarios', methods=['POST'])
+def api_scenarios():
+    params = request.get_json(silent=True)
+    if not isinstance(params, dict):
+        return {'error': 'expected a JSON object'}, 400
+    try:
+        result = run_scenarios(params)
+    except BadBatch as exc:
+        return {'error': str(exc)}, 400
+
+    def in_dollars(row):
+        return {k: v / 100 if k in SCENARIO_MONEY else v for k, v in row.items()}
+    result['baseline']  = in_dollars(result['baseline'])
+    result['scenarios'] = [in_dollars(row) for row in result['scenarios']]
+    for s in result['chart']['series']:
+        s['net'] = [c / 100 for c in s['net']]
+    return result
+
+# ---- report cache ----------------------------------------------------------
+# Generated workbooks are kept in REPORTS_DIR under a hash of everything they
+# are built from plus REPORT_LAYOUT_VERSION, so identical inputs are served
+# from disk and any edit produces a new key. Files are touched on every hit
+# and the least recently used go once the directory passes REPORT_CACHE_BYTES.
+
+REPORT_LAYOUT_VERSION = '2'   # bump whenever a cached workbook's layout changes
+
+def report_key(kind, *sources):
+    digest = hashlib.sha256(f'{kind}:{REPORT_LAYOUT_VERSION}'.encode())
+    for src in sources:
+        digest.update(b'\0' + src.encode())
+    return digest.hexdigest()
+
+def cached_report(key, build):
+    """Path of the cached workbook for `key`, calling build(fileobj) to make it on a miss."""
+    reports_dir = current_app.config['REPORTS_DIR']
+    path = os.path.join(reports_dir, f'{key}.xlsx')
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    fd, tmp = tempfile.mkstemp(dir=reports_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            build(out)
+        os.replace(tmp, path)   # atomic, so a concurrent reader never sees half a file
+    except BaseException:
+        os.remove(tmp)
+        raise
+    evict_reports(keep=path)
+    return path
+
+def evict_reports(keep=None):
+    reports_dir = current_app.config['REPORTS_DIR']
+    files = []
+    for name in os.listdir(reports_dir):
+        if name.endswith('.xlsx'):
+            st = os.stat(os.path.join(reports_dir, name))
+            files.append((st.st_mtime, st.st_size, os.path.join(reports_dir, name)))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= current_app.config['REPORT_CACHE_BYTES']:
+            break
+        if path != keep:
+            os.remove(path)
+            total -= size
 
-    df_tax   = pd.read_csv(StringIO(e.tax_csv))
-    df_exp   = pd.read_csv(StringIO(e.exp_csv))
-    df_final = pd.read_csv(StringIO(e.final_csv))
+def send_report(path, key, download_name):
+    # the key already names the exact bytes, so it doubles as a strong ETag
+    return send_file(
+      path,
+      as_attachment=True,
+      download_name=download_name,
+      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+      etag=key,
+      conditional=True
+    )
 
-    total_tax = df_tax['Total Tax'].sum()
-    total_exp = df_exp['Amount'].sum()
-    total_net = df_final['FinalNet'].sum()
+def write_entry_workbook(fileobj, entry_id, progress=None):
+    """
+    The per-entry report: taxes, expenses, incomes and a summary with pie
+    charts, every sheet from the stored Income/Expense rows, as view_entry
+    shows them; a backdated save elsewhere may have re-taxed them since.
+    Write-only, like the statements export, so rows go out as they are
+    appended instead of being held as cells.
+    """
+    from openpyxl import Workbook
+    from openpyxl.chart import PieChart, Reference
 
-    incs = Income.query.filter_by(entry_id=entry_id).all()
+    draft = stored_draft(entry_id)
+    total_tax, total_exp, total_net = final_totals(draft)
 
-    wb = Workbook()
+    wb = Workbook(write_only=True)
 
-    ws1 = wb.active
-    ws1.title = 'Taxes'
-    for row in dataframe_to_rows(df_tax, index=False, header=True):
-        ws1.append(row)
+    ws1 = wb.create_sheet('Taxes')
+    ws1.append(TAX_COLUMNS)
+    for check in draft.checks:
+        ws1.append([check[k] / 100 if k in MONEY_KEYS else check[k] for k in CHECK_KEYS])
 
     ws2 = wb.create_sheet('Expenses & Net')
     ws2.append(['Sender','Expense','Amount','Net After'])
-    for sender, name, amt, net_after in df_exp.values.tolist():
-        ws2.append([sender, name, amt, net_after])
+    for sender, name, amt, net_after in draft_expense_rows(draft):
+        ws2.append([sender, name, amt / 100, net_after / 100])
 
     ws3 = wb.create_sheet('Incomes')
     ws3.append(['Date','Sender','Type','Gross','Taxes Due'])
-    for inc in incs:
-        if inc.income_type == '1099-NEC':
-            taxes_due = 0.0
-        else:
-            fed = calculate_federal_tax(inc.Gross)
-            st  = inc.Gross * louisiana_tax_rate
-            taxes_due = round(fed + st, 2)
+    for check in draft.checks:
         ws3.append([
-            inc.date.strftime('%Y-%m-%d'),
-            inc.sender,
-            inc.income_type,
-            inc.Gross,
-            taxes_due
+            check['date'],
+            check['sender'],
+            check['type'],
+            check['gross'] / 100,
+            check['total'] / 100
         ])
 
     ws4 = wb.create_sheet('Summary')
     ws4.append(['Category','Value'])
-    ws4.append(['Total Tax',      total_tax])
-    ws4.append(['Total Expenses', total_exp])
-    ws4.append(['Final Net',      total_net])
+    ws4.append(['Total Tax',      total_tax / 100])
+    ws4.append(['Total Expenses', total_exp / 100])
+    ws4.append(['Final Net',      total_net / 100])
 
     labels = Reference(ws4, min_col=1, min_row=2, max_row=4)
     data   = Reference(ws4, min_col=2, min_row=2, max_row=4)
@@ -2424,127 +2531,295 @@ def download_entry(entry_id):
     pie2.set_categories(labels); pie2.add_data(data, titles_from_data=False)
     ws4.add_chart(pie2, 'E20')
 
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-      out,
-      as_attachment=True,
-      download_name=f'report_{entry_id}.xlsx',
-      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    wb.save(fileobj)
 
-@app.route('/download-statements')
-def download_statements():
-    filter_type = request.args.get('type', 'All')
+@bp.route('/download-entry/<int:entry_id>')
+def download_entry(entry_id):
+    Entry.query.get_or_404(entry_id)
+    if request.args.get('async'):
+        return enqueue_export('entry', entry_id=entry_id)
+
+    # every sheet comes from the stored rows, so they are the key
+    incomes = Income.query.filter_by(entry_id=entry_id).with_entities(
+        Income.date, Income.sender, Income.income_type, Income.gross_cents,
+        Income.se_cents, Income.fed_cents, Income.state_cents, Income.net_cents
+    ).order_by(Income.id).all()
+    expenses = Expense.query.filter_by(entry_id=entry_id).with_entities(
+        Expense.sender, Expense.name, Expense.amount_cents
+    ).order_by(Expense.id).all()
+    key  = report_key('entry', repr(incomes), repr(expenses))
+    path = cached_report(key, lambda out: write_entry_workbook(out, entry_id))
+    return send_report(path, key, f'report_{entry_id}.xlsx')
+
+EXPORT_CHUNK_ROWS = 2000
+
+def write_statements_workbook(fileobj, filter_type, progress=None):
+    """
+    Stream the statements export into `fileobj`. The workbook is write-only
+    and rows are pulled from SQLite in chunks, so memory stays flat no
+    matter how much history there is. `progress`, if given, is called with
+    the fraction of detail rows written so far.
+    """
+    from openpyxl import Workbook
+
+    monthly, yearly = rollup_summary(filter_type)
+
+    wb = Workbook(write_only=True)
+
+    ws1 = wb.create_sheet('Monthly Summary')
+    ws1.append(['Month','Total Income','Total Expenses','Total Taxes Due'])
+    for r in monthly:
+        ws1.append([r['month'], r['inc'] / 100, r['exp'] / 100, r['tax'] / 100])
+
+    ws2 = wb.create_sheet('Yearly Summary')
+    ws2.append(['Year','Total Income','Total Expenses','Total Taxes Due'])
+    for r in yearly:
+        ws2.append([r['year'], r['inc'] / 100, r['exp'] / 100, r['tax'] / 100])
 
-    q = Income.query
+    incs = Income.query.with_entities(
+        Income.date, Income.sender, Income.income_type,
+        Income.gross_cents, Income.tax_cents, Income.entry_id
+    )
     if filter_type != 'All':
-        q = q.filter_by(income_type=filter_type)
-    incs = q.order_by(Income.date).all()
-
-    inc_df = pd.DataFrame([{
-        'date':         i.date,
-        'Gross':        i.Gross,
-        'income_type':  i.income_type,
-        'entry_id':     i.entry_id
-    } for i in incs])
-    if inc_df.empty:
-        inc_df = pd.DataFrame(columns=['date','Gross','income_type','entry_id'])
-    inc_df['date'] = pd.to_datetime(inc_df['date'])
-
-    exp_rows = []
-    for e in Entry.query.all():
-        try:
-            df = pd.read_csv(StringIO(e.exp_csv))
-            for _, r in df.iterrows():
-                exp_rows.append({
-                    'entry_id':   e.id,
-                    'entry_date': e.timestamp.date(),
-                    'sender':     r['Sender'],
-                    'name':       r['Name'],
-                    'amt':        r['Amount']
-                })
-        except:
-            pass
-    exp_df = pd.DataFrame(exp_rows)
-    if not exp_df.empty:
-        exp_df['entry_date'] = pd.to_datetime(exp_df['entry_date'])
-    else:
-        exp_df = pd.DataFrame(columns=['entry_id','entry_date','sender','name','amt'])
+        incs = incs.filter(Income.income_type == filter_type)
 
-    inc_df['month'] = inc_df['date'].dt.to_period('M').dt.to_timestamp()
-    inc_df['year']  = inc_df['date'].dt.year
+    exps = Expense.query.with_entities(
+        Expense.date, Expense.sender, Expense.name, Expense.amount_cents, Expense.entry_id
+    )
+
+    total = (incs.count() + exps.count()) if progress else 0
+    done  = 0
+    def tick():
+        nonlocal done
+        done += 1
+        if progress and done % EXPORT_CHUNK_ROWS == 0:
+            progress(done / total)
 
-    exp_df['month'] = exp_df['entry_date'].dt.to_period('M').dt.to_timestamp()
-    exp_df['year']  = exp_df['entry_date'].dt.year
+    ws3 = wb.create_sheet('All Incomes')
+    ws3.append(['Date','Sender','Type','Gross','Taxes Due','Entry ID'])
+    for d, sender, inc_type, gross, taxes, entry_id in incs.order_by(Income.date)\
+                                                        .yield_per(EXPORT_CHUNK_ROWS):
+        ws3.append([d.strftime('%Y-%m-%d'), sender, inc_type, gross / 100, taxes / 100, entry_id])
+        tick()
 
-    mon_inc = inc_df.groupby('month')['Gross'].sum().reset_index(name='inc_total')
-    mon_exp = exp_df.groupby('month')['amt'].sum().reset_index(name='exp_total')
-    mon_tax = inc_df.assign(
-        taxes = inc_df.apply(lambda r: 0.0 if r['income_type']=='1099-NEC'
-                             else calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, axis=1)
-      ).groupby('month')['taxes'].sum().reset_index(name='tax_total')
+    ws4 = wb.create_sheet('All Expenses')
+    ws4.append(['Date','Sender','Expense','Amount','Entry ID'])
+    for d, sender, name, amt, entry_id in exps.order_by(Expense.date)\
+                                              .yield_per(EXPORT_CHUNK_ROWS):
+        ws4.append([d.strftime('%Y-%m-%d'), sender, name, amt / 100, entry_id])
+        tick()
 
-    monthly = mon_inc.merge(mon_exp, on='month', how='outer')\
-                     .merge(mon_tax, on='month', how='outer')\
-                     .fillna(0)
+    wb.save(fileobj)
 
-    yr_inc = inc_df.groupby('year')['Gross'].sum().reset_index(name='inc_total')
-    yr_exp = exp_df.groupby('year')['amt'].sum().reset_index(name='exp_total')
-    yr_tax = inc_df.assign(
-        taxes = inc_df.apply(lambda r: 0.0 if r['income_type']=='1099-NEC'
-                             else calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, axis=1)
-      ).groupby('year')['taxes'].sum().reset_index(name='tax_total')
+@bp.route('/download-statements')
+def download_statements():
+    filter_type = request.args.get('type', 'All')
+    if request.args.get('async'):
+        return enqueue_export('statements', filter_type=filter_type)
 
-    yearly = yr_inc.merge(yr_exp, on='year', how='outer')\
-                   .merge(yr_tax, on='year', how='outer')\
-                   .fillna(0)
+    # spooled to disk and streamed back; send_file closes (and so deletes) it
+    out = tempfile.TemporaryFile()
+    write_statements_workbook(out, filter_type)
+    out.seek(0)
+    return send_file(
+      out,
+      as_attachment=True,
+      download_name='statements.xlsx',
+      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
-    wb = Workbook()
+# ---- background exports ----------------------------------------------------
+# Big reports can be built off the request thread: ?async=1 on a download
+# route enqueues an ExportJob, /jobs/<id> reports progress and
+# /jobs/<id>/download serves the file once it is ready. Job rows live in
+# SQLite, so anything queued or running when the process stopped is picked
+# up again on the next start.
 
-    ws1 = wb.active
-    ws1.title = 'Monthly Summary'
-    ws1.append(['Month','Total Income','Total Expenses','Total Taxes Due'])
-    for _, r in monthly.sort_values('month').iterrows():
-        ws1.append([r['month'].strftime('%Y-%m'), r['inc_total'], r['exp_total'], r['tax_total']])
+EXPORT_BUILDERS = {
+    'statements': (write_statements_workbook, 'statements.xlsx'),
+    'entry':      (write_entry_workbook,      'report_{entry_id}.xlsx'),
+}
 
-    ws2 = wb.create_sheet('Yearly Summary')
-    ws2.append(['Year','Total Income','Total Expenses','Total Taxes Due'])
-    for _, r in yearly.sort_values('year').iterrows():
-        ws2.append([int(r['year']), r['inc_total'], r['exp_total'], r['tax_total']])
+def submit_export(job_id):
+    app = current_app._get_current_object()
+    app.extensions['export_pool'].submit(run_export_job, app, job_id)
+
+def job_status(job):
+    status = {
+        'id':         job.id,
+        'kind':       job.kind,
+        'status':     job.status,
+        'progress':   round(job.progress, 3),
+        'error':      job.error,
+        'status_url': url_for('main.export_job', job_id=job.id),
+    }
+    if job.status == 'done':
+        status['download_url'] = url_for('main.export_job_download', job_id=job.id)
+    return status
+
+def enqueue_export(kind, **params):
+    prune_export_jobs()
+    job = ExportJob(id=uuid.uuid4().hex, kind=kind, params=json.dumps(params))
+    db.session.add(job)
+    db.session.commit()
+    submit_export(job.id)
+    return job_status(job), 202
+
+def update_export_job(job_id, *where, **values):
+    """
+    Job state is written in its own short transaction: the build holds a
+    read transaction open on the session, and SQLite will not upgrade that
+    one to a writer.
+    """
+    with db.engine.begin() as conn:
+        return conn.execute(
+            db.update(ExportJob).where(ExportJob.id == job_id, *where).values(**values)
+        ).rowcount
+
+def run_export_job(app, job_id):
+    with app.app_context():
+        # claim it atomically, so a job is never built twice
+        if not update_export_job(job_id, ExportJob.status == 'queued',
+                                 status='running', progress=0.0):
+            return
+
+        job  = db.session.get(ExportJob, job_id)
+        build, _ = EXPORT_BUILDERS[job.kind]
+        path = os.path.join(app.config['EXPORT_DIR'], f'{job.id}.xlsx')
+
+        def progress(fraction):
+            update_export_job(job_id, progress=min(fraction, 0.99))
 
-    ws3 = wb.create_sheet('All Incomes')
-    ws3.append(['Date','Sender','Type','Gross','Taxes Due','Entry ID'])
-    for _, r in inc_df.sort_values('date').iterrows():
-        taxes = 0.0 if r['income_type']=='1099-NEC' else round(
-            calculate_federal_tax(r['Gross']) + r['Gross']*louisiana_tax_rate, 2)
-        ws3.append([r['date'].strftime('%Y-%m-%d'),
-                    '',  # if you want sender you can join via Income model 
-                    r['income_type'],
-                    r['Gross'],
-                    taxes,
-                    int(r['entry_id'])])
+        try:
+            with open(path, 'wb') as out:
+                build(out, progress=progress, **json.loads(job.params))
+        except Exception as exc:
+            app.logger.exception('export job %s failed', job_id)
+            update_export_job(job_id, status='failed', error=repr(exc),
+                              finished_at=datetime.utcnow())
+        else:
+            update_export_job(job_id, status='done', progress=1.0, path=path,
+                              finished_at=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+def prune_export_jobs():
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['EXPORT_JOB_TTL'])
+    for job in ExportJob.query.filter(ExportJob.finished_at < cutoff):
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+        db.session.delete(job)
+    db.session.commit()
 
-    ws4 = wb.create_sheet('All Expenses')
-    ws4.append(['Entry Date','Sender','Expense','Amount','Entry ID'])
-    for _, r in exp_df.sort_values('entry_date').iterrows():
-        ws4.append([r['entry_date'].strftime('%Y-%m-%d'),
-                    r['sender'],
-                    r['name'],
-                    r['amt'],
-                    int(r['entry_id'])])
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
+@bp.before_app_request
+def resume_export_jobs():
+    # done on the first request rather than in create_app() so the
+    # reloader's watcher process never starts building reports
+    if current_app.extensions['export_jobs_resumed']:
+        return
+    current_app.extensions['export_jobs_resumed'] = True
+    ExportJob.query.filter_by(status='running').update({'status': 'queued'})
+    db.session.commit()
+    for (job_id,) in ExportJob.query.filter_by(status='queued').with_entities(ExportJob.id):
+        submit_export(job_id)
+
+@bp.route('/jobs/<job_id>')
+def export_job(job_id):
+    return job_status(ExportJob.query.get_or_404(job_id))
+
+@bp.route('/jobs/<job_id>/download')
+def export_job_download(job_id):
+    job = ExportJob.query.get_or_404(job_id)
+    if job.status != 'done':
+        return job_status(job), 409
+    _, name = EXPORT_BUILDERS[job.kind]
     return send_file(
-      out,
+      job.path,
       as_attachment=True,
-      download_name='statements.xlsx',
+      download_name=name.format(**json.loads(job.params)),
       mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
+
+def explain_query_plan(query):
+    """SQLite's EXPLAIN QUERY PLAN detail lines for an ORM query, without running it."""
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + statement, parameters
+
+    with db.engine.connect() as conn:
+        event.listen(conn, 'before_cursor_execute', explain, retval=True)
+        return [row[-1] for row in conn.execute(query.statement)]
+
+# The hot lookups and the index each one must use. Kept next to the
+# routes so a query change that falls back to a full table scan gets caught.
+QUERY_PLAN_CHECKS = [
+    ('statements type list',
+     lambda: Income.query.with_entities(Income.income_type).distinct(),
+     'ix_income_type_date'),
+    ('statement month, filtered',
+     lambda: Income.query.filter(Income.income_type == '1099-NEC',
+                                 Income.date >= date(2024, 1, 1),
+                                 Income.date <  date(2024, 2, 1)).order_by(Income.date),
+     'ix_income_type_date'),
+    ('statement month, all types',
+     lambda: Income.query.filter(Income.date >= date(2024, 1, 1),
+                                 Income.date <  date(2024, 2, 1)).order_by(Income.date),
+     'ix_income_date'),
+    ('download_statements, filtered',
+     lambda: Income.query.filter_by(income_type='W-2').order_by(Income.date),
+     'ix_income_type_date'),
+    ('download_statements, all types',
+     lambda: Income.query.order_by(Income.date),
+     'ix_income_date'),
+    ('download_entry',
+     lambda: Income.query.filter_by(entry_id=1),
+     'ix_income_entry_id'),
+    ('saved_entries page',
+     lambda: Entry.query.filter(db.tuple_(Entry.timestamp, Entry.id) < (datetime(2024, 1, 1), 1))
+                        .order_by(Entry.timestamp.desc(), Entry.id.desc()).limit(50),
+     'ix_entry_timestamp_id'),
+]
+
+@bp.cli.command('check-query-plans')
+def check_query_plans():
+    """Fail if any hot query no longer uses its index."""
+    failed = False
+    for label, build, index in QUERY_PLAN_CHECKS:
+        plan = explain_query_plan(build())
+        ok   = any(index in line for line in plan)
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: {' | '.join(plan)}")
+    if failed:
+        sys.exit(1)
+
+def create_app(config=None):
+    """Build the app; `config` overrides DEFAULT_CONFIG (benchmarks point it at a scratch DB)."""
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    os.makedirs(app.config['EXPORT_DIR'], exist_ok=True)
+    os.makedirs(app.config['REPORTS_DIR'], exist_ok=True)
+
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.extensions['export_pool'] = ThreadPoolExecutor(max_workers=app.config['EXPORT_WORKERS'],
+                                                       thread_name_prefix='export')
+    app.extensions['export_jobs_resumed'] = False
+    app.extensions['statements_cache'] = lru_cache(maxsize=app.config['STATEMENTS_CACHE_SIZE'])(statements_context)
+
+    load_templates(app)
+    before_render_template.connect(start_render_timer, app)
+    template_rendered.connect(record_render_time, app)
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', partial(set_sqlite_pragmas, app.config['SQLITE_PRAGMAS']))
+        event.listen(db.engine, 'before_cursor_execute', start_query_timer)
+        event.listen(db.engine, 'after_cursor_execute',  record_query_time)
+        db.create_all()
+        convert_money_columns()
+        add_missing_columns()
+        add_missing_indexes()
+        run_migrations()
+    return app
+
 if __name__ == '__main__':
-   
-     app.run(debug=True)
-     
+    create_app().run(debug=True, port=int(os.environ.get('PORT', 5000)))
@@ -1,11 +1,14 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# Jinja bytecode from `flask --app index compile-templates`, loaded by the exe at startup
+template_cache = [('template_cache', 'template_cache')] if os.path.isdir('template_cache') else []
 
 a = Analysis(
     ['index.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=template_cache,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
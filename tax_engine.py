@@ -0,0 +1,318 @@
+import bisect
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import numpy as np
+
+# Money is integer cents (int64 in arrays) everywhere. Rates are whole
+# basis points (ten-thousandths; 4.25% is 425), so a rate times cents is
+# exact in "scaled cents" of 1/RATE_SCALE cent; each tax component is
+# rounded to the cent once, half away from zero, by round_scaled(). A rate
+# any finer is refused rather than rounded. Dollars only appear at the
+# edges: to_cents() on the way in, dollars() on the way out.
+RATE_SCALE = 10_000
+
+# the largest amount to_cents() accepts, ~$9.2 billion: with room for a
+# rate and a running total, its scaled cents still fit an int64
+MAX_CENTS = 2**63 // (RATE_SCALE * 1000)
+
+FEDERAL_RATES = (0.10, 0.12, 0.22, 0.24, 0.32, 0.35, 0.37)
+
+# One entry per tax year: the upper edges of the federal brackets (single
+# filer, one per rate in FEDERAL_RATES but the last), the Social Security
+# wage base, both in dollars, and Louisiana's flat rate. `version` is stored
+# on every Income row so it is clear which rules produced its taxes; bump it
+# whenever a year's figures change. Years outside the table use the nearest one.
+SCHEDULES = {
+    2022: {'version': '2022.1', 'ss_wage_base': 147_000, 'state_rate': 0.04,
+           'brackets': (10_275, 41_775, 89_075, 170_050, 215_950, 539_900)},
+    2023: {'version': '2023.2', 'ss_wage_base': 160_200, 'state_rate': 0.04,
+           'brackets': (11_000, 44_725, 95_375, 182_100, 231_250, 578_125)},
+    2024: {'version': '2024.1', 'ss_wage_base': 168_600, 'state_rate': 0.04,
+           'brackets': (11_600, 47_150, 100_525, 191_950, 243_725, 609_350)},
+    2025: {'version': '2025.1', 'ss_wage_base': 176_100, 'state_rate': 0.03,
+           'brackets': (11_925, 48_475, 103_350, 197_300, 250_525, 626_350)},
+}
+_schedule_years = sorted(SCHEDULES)
+
+SS_RATE      = 1240   # Social Security 12.4%, in basis points
+MED_RATE     = 290    # Medicare 2.9%
+
+# only these income types owe SE / federal / state tax in this calculator
+TAXED_TYPES = ('1099-NEC',)
+
+# Social Security stops at the year's wage base of combined wages and SE
+# earnings, so W-2 pay uses up the base just as 1099 income does
+SS_WAGE_TYPES = ('1099-NEC', 'W-2')
+
+
+def to_cents(amount):
+    """
+    Dollars (str, int, float or Decimal) to int cents, half away from zero;
+    ValueError if `amount` is not a finite number or is beyond MAX_CENTS.
+    """
+    try:
+        cents = int(Decimal(str(amount).strip()).quantize(Decimal('0.01'), ROUND_HALF_UP).scaleb(2))
+    except ArithmeticError:
+        raise ValueError(f'not an amount: {amount!r}')
+    if abs(cents) > MAX_CENTS:
+        raise ValueError(f'amount out of range: {amount!r}')
+    return cents
+
+
+def dollars(cents):
+    """'1234.56' for 123456 cents: exact, unlike formatting cents / 100."""
+    sign = '-' if cents < 0 else ''
+    return f'{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}'
+
+
+def round_scaled(amount):
+    """int64 scaled cents (array-like) to int64 cents, half away from zero."""
+    amount = np.asarray(amount, dtype='int64')
+    return np.sign(amount) * ((np.abs(amount) + RATE_SCALE // 2) // RATE_SCALE)
+
+
+def _basis_points(rate):
+    """`rate` (a fraction) in whole basis points; ValueError if it is finer than that."""
+    points = round(rate * RATE_SCALE)
+    if abs(rate * RATE_SCALE - points) > 1e-6:
+        raise ValueError(f'rate {rate!r} is not a whole number of basis points')
+    return int(points)
+
+
+class TaxSchedule:
+    """
+    One year's rules, compiled into a cumulative bracket table in cents: the
+    tax owed on exactly `lows[k]` cents is `bases[k]` scaled cents, so the tax
+    on any income is one lookup plus one multiply, and exact.
+    """
+
+    def __init__(self, year, version, brackets, ss_wage_base, state_rate):
+        self.year         = year
+        self.version      = version
+        self.ss_wage_base = ss_wage_base * 100
+        self.state_rate   = _basis_points(state_rate)
+        edges = (0, *brackets, float('inf'))
+        self.brackets = [(lo, hi, rate) for lo, hi, rate in zip(edges, edges[1:], FEDERAL_RATES)]
+        self.lows  = np.array([lo * 100 for lo, _, _ in self.brackets], dtype='int64')
+        self.rates = np.array([_basis_points(rate) for _, _, rate in self.brackets], dtype='int64')
+        self.bases = np.concatenate((
+            [0],
+            np.cumsum(np.diff(self.lows) * self.rates[:-1]),
+        )).astype('int64')
+        self._lows_list = self.lows.tolist()
+
+    def federal_tax(self, income: int) -> int:
+        """Federal tax in cents on `income` cents."""
+        if income <= 0:
+            return 0
+        k = bisect.bisect_left(self._lows_list, income) - 1
+        return int(round_scaled(self.bases[k] + (income - self.lows[k]) * self.rates[k]))
+
+    def federal_tax_scaled(self, income):
+        """Unrounded federal tax on every element of `income` (array-like of cents)."""
+        income = np.asarray(income, dtype='int64')
+        k   = np.maximum(np.searchsorted(self.lows, income, side='left') - 1, 0)
+        tax = self.bases[k] + (income - self.lows[k]) * self.rates[k]
+        return np.where(income > 0, tax, 0)
+
+    def federal_tax_batch(self, income):
+        """Federal tax in cents for every element of `income` (array-like of cents)."""
+        return round_scaled(self.federal_tax_scaled(income))
+
+
+@lru_cache(maxsize=None)
+def _compiled(year):
+    return TaxSchedule(year, **SCHEDULES[year])
+
+def schedule_for(year=None):
+    """The TaxSchedule for `year` (default: the current one), compiled on first use."""
+    if year is None:
+        year = date.today().year
+    k = max(bisect.bisect_right(_schedule_years, year) - 1, 0)
+    return _compiled(_schedule_years[k])
+
+
+def calculate_federal_tax(income: int, year=None) -> int:
+    return schedule_for(year).federal_tax(income)
+
+
+def federal_tax_batch(income, year=None):
+    """Federal tax for every element of `income` under one year's brackets."""
+    return schedule_for(year).federal_tax_batch(income)
+
+
+def running_ytd(keys, income_types, gross):
+    """
+    Year-to-date (SS wages, taxable income) cents before each check of a
+    batch, as two lists. `keys` holds a (year, sort key) pair per check:
+    checks of the same year share running totals and are taken in sort-key
+    order, ties in the order given.
+    """
+    wages   = [0] * len(gross)
+    taxable = [0] * len(gross)
+    running = defaultdict(lambda: [0, 0])
+    for k in sorted(range(len(gross)), key=keys.__getitem__):
+        totals = running[keys[k][0]]
+        wages[k], taxable[k] = totals
+        if income_types[k] in SS_WAGE_TYPES:
+            totals[0] += gross[k]
+        if income_types[k] in TAXED_TYPES:
+            totals[1] += gross[k]
+    return wages, taxable
+
+
+def compute_taxes(gross, income_types, ytd_wages=None, ytd_taxable=None, years=None):
+    """
+    Tax breakdown for a batch of checks in one pass.
+
+    `gross` (cents) and `income_types` are equal-length array-likes; the
+    result is a dict of int64 cent arrays keyed 'se', 'fed', 'state',
+    'total' and 'net', plus 'version', the schedule version each check was
+    taxed under. SE, federal and state tax are each rounded to the cent
+    once; total and net are exact sums of those.
+    Checks whose type is not in TAXED_TYPES owe nothing. `ytd_wages`, when
+    given, is each check's SS wages earned earlier in its year: only the part
+    of a check still under the wage base owes the Social Security share.
+    `ytd_taxable` is likewise the year's taxable income before each check,
+    which then owes the federal tax on the year's income with it minus the
+    tax without it, i.e. it is taxed in the brackets it actually lands in.
+    `years` picks each check's schedule; without it all use the current one.
+    """
+    gross  = np.asarray(gross, dtype='int64')
+    taxed  = np.isin(np.asarray(income_types, dtype=object), TAXED_TYPES)
+    wages  = np.zeros_like(gross) if ytd_wages is None else np.asarray(ytd_wages, dtype='int64')
+    before = None if ytd_taxable is None else np.asarray(ytd_taxable, dtype='int64')
+    years  = np.full(len(gross), schedule_for().year) if years is None else np.asarray(years)
+
+    se      = np.empty_like(gross)
+    fed     = np.empty_like(gross)
+    state   = np.empty_like(gross)
+    version = np.empty(len(gross), dtype=object)
+    # one vectorised pass per schedule; a batch rarely spans more than a few years
+    for year in np.unique(years).tolist():
+        sched = schedule_for(year)
+        m     = years == year
+        g     = gross[m]
+        ss_room  = np.maximum(sched.ss_wage_base - wages[m], 0)
+        se[m]    = round_scaled(np.minimum(g, ss_room) * SS_RATE + g * MED_RATE)
+        if before is None:
+            fed[m] = sched.federal_tax_batch(g)
+        else:
+            fed[m] = round_scaled(sched.federal_tax_scaled(before[m] + g)
+                                      - sched.federal_tax_scaled(before[m]))
+        state[m]   = round_scaled(g * sched.state_rate)
+        version[m] = sched.version
+
+    se    = np.where(taxed, se,    0)
+    fed   = np.where(taxed, fed,   0)
+    state = np.where(taxed, state, 0)
+    total = se + fed + state
+    return {
+        'se':      se,
+        'fed':     fed,
+        'state':   state,
+        'total':   total,
+        'net':     gross - total,
+        'version': version,
+    }
+
+
+def _ramp_sum(c, points, prefix):
+    """sum(max(c - p, 0) for p in points) for every element of `c`; `points` sorted, `prefix` its cumsum from 0."""
+    k = np.searchsorted(points, c, side='right')
+    return k * c - prefix[k]
+
+
+def _over_sum(c, points, prefix):
+    """sum(max(p - c, 0) for p in points) for every element of `c`; as _ramp_sum()."""
+    return _ramp_sum(c, points, prefix) + prefix[-1] - len(points) * c
+
+
+def _federal_sum(sched, m, points, prefix):
+    """sum(F(m * p) for p in points) in cents for every multiplier in `m`, F being `sched`'s federal tax."""
+    # F(y) is the sum over brackets of (rate - rate below) * max(y - low, 0)
+    total = np.zeros_like(m)
+    pos   = m > 0
+    for low, step in zip(sched.lows.tolist(), np.diff(sched.rates, prepend=0).tolist()):
+        total[pos] += step * m[pos] * _over_sum(low / m[pos], points, prefix)
+    return total / RATE_SCALE
+
+
+def scenario_grid(gross, income_types, years, ytd_wages, multipliers, schedules, state_rates,
+                  ytd_taxable=None):
+    """
+    Totals of a batch of checks under every combination of three what-if
+    axes: `multipliers` scale each gross, `schedules` holds a TaxSchedule
+    per entry (None: each check's own year) and `state_rates` a flat rate
+    per entry (None: the schedule's). `ytd_wages` and `ytd_taxable` are as
+    for compute_taxes(), and are scaled by the multiplier too: a scenario is
+    the whole year's income m times over, and these checks' share of it.
+
+    Returns float cent arrays shaped (multipliers, schedules, state_rates)
+    keyed 'gross', 'se', 'fed', 'state', 'total' and 'net', rounded to the
+    cent. Nothing is evaluated check by check, so the cost does not grow
+    with grid size times batch size: a check's federal tax is
+    F(m * (before + gross)) - F(m * before), and F is a sum of one clipped
+    ramp per bracket, so like the Social Security share (m times a sum of
+    clipped ramps) the year's total is read off sorted per-year arrays.
+    Without `ytd_taxable` the checks form a chain from zero, which
+    telescopes to F(m * taxable income). The results therefore match
+    compute_taxes() to within a cent per check, which rounds each check's
+    components separately.
+    """
+    gross  = np.asarray(gross, dtype='int64')
+    taxed  = np.isin(np.asarray(income_types, dtype=object), TAXED_TYPES)
+    wages  = np.asarray(ytd_wages, dtype='int64')
+    before = None if ytd_taxable is None else np.asarray(ytd_taxable, dtype='int64')
+    years  = np.asarray(years)
+    m      = np.asarray(multipliers, dtype=float)
+    n_m, n_b, n_r = len(multipliers), len(schedules), len(state_rates)
+
+    ss    = np.zeros((n_m, n_b))
+    fed   = np.zeros((n_m, n_b))
+    state = np.zeros((n_m, n_b, n_r))
+    taxed_total = 0
+    for year in np.unique(years).tolist():
+        mask  = (years == year) & taxed
+        g, w  = gross[mask], wages[mask]
+        total = int(g.sum())
+        taxed_total += total
+        # sum over checks of min(g, max(base - w, 0)) = ramps from w minus ramps from w + g
+        lows, highs = np.sort(w), np.sort(w + g)
+        low_prefix  = np.concatenate(([0], np.cumsum(lows)))
+        high_prefix = np.concatenate(([0], np.cumsum(highs)))
+        if before is not None:
+            # F(m * (before + g)) - F(m * before), summed the same way
+            starts = np.sort(before[mask])
+            ends   = np.sort(before[mask] + g)
+            start_prefix = np.concatenate(([0], np.cumsum(starts)))
+            end_prefix   = np.concatenate(([0], np.cumsum(ends)))
+        for b, sched in enumerate(schedules):
+            sched = sched or schedule_for(year)
+            if before is None:
+                fed[:, b] += sched.federal_tax_scaled(np.rint(m * total)) / RATE_SCALE
+            else:
+                fed[:, b] += (_federal_sum(sched, m, ends, end_prefix)
+                              - _federal_sum(sched, m, starts, start_prefix))
+            room = np.divide(sched.ss_wage_base, m, out=np.full_like(m, np.inf), where=m > 0)
+            room = np.minimum(room, highs[-1] if len(highs) else 0)
+            under_base = _ramp_sum(room, lows, low_prefix) - _ramp_sum(room, highs, high_prefix)
+            ss[:, b] += m * under_base * SS_RATE / RATE_SCALE
+            rates = [sched.state_rate / RATE_SCALE if r is None else r for r in state_rates]
+            state[:, b, :] += np.outer(m * total, rates)
+
+    se    = ss + (m * taxed_total * MED_RATE / RATE_SCALE)[:, None]
+    shape = (n_m, n_b, n_r)
+    result = {
+        'gross': np.broadcast_to((m * int(gross.sum()))[:, None, None], shape),
+        'se':    np.broadcast_to(se[:, :, None], shape),
+        'fed':   np.broadcast_to(fed[:, :, None], shape),
+        'state': state,
+    }
+    result = {k: np.rint(v) for k, v in result.items()}
+    result['total'] = result['se'] + result['fed'] + result['state']
+    result['net']   = result['gross'] - result['total']
+    return result
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app is a single index.py at the top of the checkout, as for benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
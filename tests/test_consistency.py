@@ -0,0 +1,9 @@
+"""Year-to-date totals kept incrementally match a recompute (see benchmarks/consistency.py)."""
+import pytest
+
+from benchmarks.consistency import first_drift
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_no_drift(seed):
+    assert first_drift(steps=40, seed=seed) is None
@@ -0,0 +1,12 @@
+"""The report paths run a fixed number of SQL statements (see benchmarks/queries.py)."""
+from benchmarks.generate import generate
+from benchmarks.queries import growing, measure
+
+
+def test_query_counts_do_not_grow_with_entries(tmp_path):
+    results = {}
+    for entries in (20, 200):
+        path = str(tmp_path / f'queries_{entries}.db')
+        generate(path, entries=entries)
+        results[entries] = measure(path)
+    assert not growing(results), results
@@ -0,0 +1,20 @@
+"""The hot queries keep using their indexes (what `flask check-query-plans` reports)."""
+import pytest
+
+from index import QUERY_PLAN_CHECKS, create_app, explain_query_plan
+from benchmarks.generate import generate, scratch_config
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    path = tmp_path_factory.mktemp('plans') / 'plans.db'
+    generate(str(path), entries=50)
+    return create_app(scratch_config(str(path)))
+
+
+@pytest.mark.parametrize('label, build, index', QUERY_PLAN_CHECKS,
+                         ids=[label for label, _, _ in QUERY_PLAN_CHECKS])
+def test_query_uses_index(app, label, build, index):
+    with app.app_context():
+        plan = explain_query_plan(build())
+    assert any(index in line for line in plan), f'{label}: {" | ".join(plan)}'